@@ -1,21 +1,123 @@
 import sqlite3
+import threading
+
+from snapshot import connect_snapshot
+from user_row import user_row_factory
+
 
 class DatabaseConnection:
-    def __init__(self, db_name):
+    # keep_alive=True borrows a long-lived connection (one per database per
+    # thread) instead of connecting on every __enter__. Nested blocks reuse
+    # the outer block's connection: the outermost block commits or rolls
+    # back, each nested block runs in a SAVEPOINT that is released on a
+    # clean exit or rolled back to when the block raised. Calling commit()
+    # inside a nested block commits the outer block's work too. The same
+    # instance may be entered more than once. readonly=True opens a
+    # memory-mapped read-only snapshot (see connect_snapshot) for
+    # read-heavy work.
+    # row_factory (e.g. user_row.user_row_factory) is installed on the
+    # connection for the duration of the block.
+    _keep_alive = threading.local()
+
+    def __init__(self, db_name, keep_alive=False, readonly=False, row_factory=None):
         self.db_name = db_name
+        self.keep_alive = keep_alive
+        self.readonly = readonly
+        self.row_factory = row_factory
         self.conn = None
+        self._entered = []  # (conn, previous row_factory, savepoint or None)
+
+    def _connect(self):
+        if self.readonly:
+            return connect_snapshot(self.db_name)
+        return sqlite3.connect(self.db_name)
+
+    @classmethod
+    def _shared(cls):
+        shared = getattr(cls._keep_alive, "conns", None)
+        if shared is None:
+            shared = cls._keep_alive.conns = {}  # (db_name, readonly) -> [conn, depth]
+        return shared
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_name)
-        return self.conn
+        savepoint = None
+        if not self.keep_alive:
+            conn = self._connect()
+        else:
+            key = (self.db_name, self.readonly)
+            entry = self._shared().get(key)
+            if entry is None:
+                entry = self._shared()[key] = [self._connect(), 0]
+            conn = entry[0]
+            if entry[1]:
+                # Nested block: open the outer transaction first so the
+                # savepoint nests inside it instead of starting its own
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                savepoint = f"db_connection_{entry[1]}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+            entry[1] += 1
+        previous_row_factory = conn.row_factory
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        self._entered.append((conn, previous_row_factory, savepoint))
+        self.conn = conn
+        return conn
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if self.conn:
-            self.conn.close()
+        if not self._entered:
+            return
+        conn, previous_row_factory, savepoint = self._entered.pop()
+        self.conn = self._entered[-1][0] if self._entered else None
+        conn.row_factory = previous_row_factory
+        if self.keep_alive:
+            self._shared()[(self.db_name, self.readonly)][1] -= 1
+        # Commit on a clean exit, roll back when the block raised
+        if savepoint is not None:
+            # A commit or rollback inside the block ends the outer
+            # transaction and the savepoint with it; there is nothing
+            # left to release then
+            try:
+                if conn.in_transaction:
+                    if exc_type is not None:
+                        conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+            except sqlite3.OperationalError as e:
+                if "no such savepoint" not in str(e):
+                    raise
+        elif exc_type is None:
+            conn.commit()
+        else:
+            conn.rollback()
+        if not self.keep_alive:
+            conn.close()
+
+    # Close this thread's keep-alive connections that are not in use
+    @classmethod
+    def close_idle(cls):
+        shared = cls._shared()
+        for key, (conn, depth) in list(shared.items()):
+            if depth == 0:
+                conn.close()
+                del shared[key]
 
 # Use the context manager to perform a query
 with DatabaseConnection('users.db') as conn:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users")
     results = cursor.fetchall()
-    print(results)
\ No newline at end of file
+    print(results)
+
+# Read-only snapshot for scans
+with DatabaseConnection('users.db', readonly=True) as conn:
+    print(conn.execute("SELECT COUNT(*) FROM users").fetchone())
+
+# Rows as compact UserRow objects with attribute access
+with DatabaseConnection('users.db', row_factory=user_row_factory) as conn:
+    for user in conn.execute("SELECT * FROM users LIMIT 3"):
+        print(user.id, user.name, user.email)
+
+# Nested blocks share one kept-alive connection
+with DatabaseConnection('users.db', keep_alive=True) as conn:
+    with DatabaseConnection('users.db', keep_alive=True) as inner:
+        print(inner is conn)
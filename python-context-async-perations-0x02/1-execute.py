@@ -1,21 +1,52 @@
 import sqlite3
 
+from snapshot import connect_snapshot
+from user_row import user_row_factory
+
+
 class ExecuteQuery:
-    def __init__(self, db_name, query, params=None):
+    # stream=True makes __enter__ return a lazy iterator over the rows,
+    # fetched `arraysize` at a time, instead of a fully materialized list.
+    # readonly=True runs the query against a read-only snapshot.
+    # row_factory (e.g. user_row.user_row_factory) shapes the returned rows.
+    def __init__(self, db_name, query, params=None, stream=False, arraysize=1000,
+                 readonly=False, row_factory=None):
         self.db_name = db_name
         self.query = query
         self.params = params or ()
+        self.stream = stream
+        self.arraysize = arraysize
+        self.readonly = readonly
+        self.row_factory = row_factory
         self.conn = None
+        self.cursor = None
         self.results = None
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_name)
-        cursor = self.conn.cursor()
-        cursor.execute(self.query, self.params)
-        self.results = cursor.fetchall()
+        if self.readonly:
+            self.conn = connect_snapshot(self.db_name)
+        else:
+            self.conn = sqlite3.connect(self.db_name)
+        self.cursor = self.conn.cursor()
+        self.cursor.arraysize = self.arraysize
+        if self.row_factory is not None:
+            self.cursor.row_factory = self.row_factory
+        self.cursor.execute(self.query, self.params)
+        if self.stream:
+            return self._iter_rows()
+        self.results = self.cursor.fetchall()
         return self.results
 
+    def _iter_rows(self):
+        while True:
+            rows = self.cursor.fetchmany()
+            if not rows:
+                return
+            yield from rows
+
     def __exit__(self, exc_type, exc_value, traceback):
+        if self.cursor:
+            self.cursor.close()
         if self.conn:
             self.conn.close()
 
@@ -25,3 +56,12 @@ params = (25,)
 
 with ExecuteQuery('users.db', query, params) as results:
     print(results)
+
+# Same query with rows as UserRow objects
+with ExecuteQuery('users.db', query, params, row_factory=user_row_factory) as users:
+    print([user.name for user in users])
+
+# Stream the same rows without loading them all at once
+with ExecuteQuery('users.db', query, params, stream=True, arraysize=500) as rows:
+    for row in rows:
+        print(row)
@@ -1,31 +1,230 @@
 import aiosqlite
 import asyncio
+import sqlite3
+import contextlib
+from collections import namedtuple
 
-# Asynchronously fetch all users
-async def async_fetch_users():
-    async with aiosqlite.connect("users.db") as db:
-        cursor = await db.execute("SELECT * FROM users")
-        results = await cursor.fetchall()
-        await cursor.close()
-        print("All Users:", results)
-        return results
-
-# Asynchronously fetch users older than 40
-async def async_fetch_older_users():
-    async with aiosqlite.connect("users.db") as db:
-        cursor = await db.execute("SELECT * FROM users WHERE age > 40")
-        results = await cursor.fetchall()
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time"""
+
+
+# Close a connection that may still be running a query whose coroutine was
+# cancelled or timed out: the statement keeps going on aiosqlite's worker
+# thread and close() is queued behind it, so interrupt it until the close
+# goes through
+async def abandon(db):
+    closing = asyncio.ensure_future(db.close())
+    while not closing.done():
+        try:
+            await db.interrupt()
+        except (ValueError, sqlite3.Error):
+            pass  # already closed
+        await asyncio.wait([closing], timeout=0.05)
+    with contextlib.suppress(Exception):
+        closing.result()
+
+
+# Bounded pool of aiosqlite connections, shared by the coroutines of one
+# event loop. A semaphore caps the number of checked-out connections;
+# returned connections are reused most-recently-used first.
+class AsyncConnectionPool:
+    def __init__(self, db_path, max_size=5, timeout=5.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle = []
+
+    async def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"no connection to {self.db_path} available after {timeout}s") from None
+        try:
+            if self._idle:
+                return self._idle.pop()
+            return await aiosqlite.connect(self.db_path)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, db):
+        try:
+            if db.in_transaction:
+                await db.rollback()  # never hand out a connection mid-transaction
+            self._idle.append(db)
+        except Exception:
+            await db.close()
+        finally:
+            self._slots.release()
+
+    # Close `db` instead of returning it, for a connection that may still
+    # be running an abandoned query
+    async def discard(self, db):
+        try:
+            await abandon(db)
+        finally:
+            self._slots.release()
+
+    # A block left by a timeout or cancellation discards its connection
+    @contextlib.asynccontextmanager
+    async def connection(self, timeout=None):
+        db = await self.acquire(timeout)
+        try:
+            yield db
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            await self.discard(db)
+            raise
+        except BaseException:
+            await self.release(db)
+            raise
+        await self.release(db)
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+# Borrow from the pool when one is given, otherwise open a fresh connection
+@contextlib.asynccontextmanager
+async def connect(pool=None):
+    if pool is None:
+        db = await aiosqlite.connect("users.db")
+        try:
+            yield db
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            await abandon(db)
+            raise
+        finally:
+            await db.close()
+    else:
+        async with pool.connection() as db:
+            yield db
+
+# Yield the rows of a query in lists of at most `batch_size` using
+# fetchmany, so only one batch is held in memory at a time
+async def stream_batches(db, query, params=(), batch_size=500):
+    cursor = await db.execute(query, params)
+    try:
+        while True:
+            rows = await cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
         await cursor.close()
-        print("Users older than 40:", results)
-        return results
 
-# Run both queries concurrently
+# Yield the rows of a query one at a time (fetched in batches underneath)
+async def stream_rows(db, query, params=(), batch_size=500):
+    async for rows in stream_batches(db, query, params, batch_size):
+        for row in rows:
+            yield row
+
+# Asynchronously stream all users, returns the number of rows
+async def async_fetch_users(pool=None, batch_size=500):
+    count = 0
+    async with connect(pool) as db:
+        print("All Users:")
+        async for row in stream_rows(db, "SELECT * FROM users", batch_size=batch_size):
+            print(row)
+            count += 1
+    return count
+
+# Asynchronously stream users older than 40, returns the number of rows
+async def async_fetch_older_users(pool=None, batch_size=500):
+    count = 0
+    async with connect(pool) as db:
+        print("Users older than 40:")
+        async for row in stream_rows(db, "SELECT * FROM users WHERE age > ?", (40,), batch_size):
+            print(row)
+            count += 1
+    return count
+
+# Run both queries concurrently, sharing pooled connections
 async def fetch_concurrently():
-    results = await asyncio.gather(
-        async_fetch_users(),
-        async_fetch_older_users()
-    )
+    async with AsyncConnectionPool("users.db", max_size=4) as pool:
+        results = await asyncio.gather(
+            async_fetch_users(pool),
+            async_fetch_older_users(pool)
+        )
+    return results
+
+# Outcome of one scheduled query. `rows` is None when `error` is set
+# (including asyncio.TimeoutError, in which case the query is interrupted
+# and its connection closed rather than reused). `wait` is the time spent
+# queued for a concurrency slot and a connection, `elapsed` the time spent
+# executing, both in seconds.
+QueryResult = namedtuple("QueryResult", "query params rows error wait elapsed")
+
+# Run many queries with at most `limit` in flight at once and yield a
+# QueryResult for each as soon as it completes. Queries are SQL strings,
+# (sql, params) pairs or (sql, params, timeout) triples; `timeout` is the
+# default bound on each query's execution time.
+# Closing the generator early cancels the queries still queued or running.
+async def run_queries(queries, pool=None, limit=4, timeout=None):
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(limit)
+
+    async def fetch(db, query, params):
+        return [row async for row in stream_rows(db, query, params)]
+
+    async def run_one(query, params, query_timeout, queued_at):
+        async with slots:
+            started = None
+            try:
+                async with connect(pool) as db:
+                    started = loop.time()
+                    rows = await asyncio.wait_for(fetch(db, query, params), query_timeout)
+                error = None
+            except Exception as e:
+                rows, error = None, e
+            finished = loop.time()
+            if started is None:  # no connection could be obtained
+                return QueryResult(query, params, None, error, finished - queued_at, 0.0)
+            return QueryResult(query, params, rows, error, started - queued_at, finished - started)
+
+    tasks = []
+    for query in queries:
+        if isinstance(query, str):
+            sql, params, query_timeout = query, (), timeout
+        elif len(query) == 2:
+            (sql, params), query_timeout = query, timeout
+        else:
+            sql, params, query_timeout = query
+        tasks.append(asyncio.ensure_future(run_one(sql, params, query_timeout, loop.time())))
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# Fan a list of queries out over a shared pool, printing each as it completes
+async def fetch_queries_concurrently(queries, limit=4, timeout=None):
+    results = []
+    async with AsyncConnectionPool("users.db", max_size=limit) as pool:
+        async for result in run_queries(queries, pool, limit, timeout):
+            status = f"{len(result.rows)} rows" if result.error is None else f"failed: {result.error!r}"
+            print(f"{result.query} {result.params}: {status} "
+                  f"(queued {result.wait * 1000:.1f} ms, ran {result.elapsed * 1000:.1f} ms)")
+            results.append(result)
     return results
 
 # Run the async function
-asyncio.run(fetch_concurrently())
\ No newline at end of file
+asyncio.run(fetch_concurrently())
+
+# Fan out a batch of queries under a concurrency limit
+asyncio.run(fetch_queries_concurrently(
+    [("SELECT * FROM users WHERE age > ?", (age,)) for age in range(20, 70, 5)],
+    limit=4,
+    timeout=10,
+))
@@ -0,0 +1,248 @@
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import resource
+import tracemalloc
+import subprocess
+import tempfile
+import importlib
+import timeit
+import contextlib
+
+# Benchmarks for the context managers and coroutines in this directory.
+# Run with: python bench.py [name ...]
+# Every run works against a throwaway users.db in a temp dir.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+N_USERS = 1_000
+
+
+def seed(db_path, n_users=N_USERS):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS users "
+        "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(n_users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+# Import one of the numbered task scripts without echoing its demo output
+def load(name):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return importlib.import_module(name)
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def bench_async_pool(fetches=1_000):
+    mod = load("3-concurrent")
+
+    async def unpooled():
+        await asyncio.gather(*(mod.async_fetch_older_users() for _ in range(fetches)))
+
+    async def pooled():
+        async with mod.AsyncConnectionPool("users.db", max_size=8, timeout=300) as pool:
+            await asyncio.gather(*(mod.async_fetch_older_users(pool) for _ in range(fetches)))
+
+    for label, run in [("unpooled", unpooled), ("pooled (8 connections)", pooled)]:
+        start = time.perf_counter()
+        with quiet():
+            asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        print(f"{fetches} concurrent fetches, {label:<24} {elapsed:8.3f} s")
+
+
+# Runs in a fresh interpreter so ru_maxrss reflects only one mode
+def rss_child(mode):
+    import aiosqlite
+    mod = load("3-concurrent")
+
+    async def run():
+        count = 0
+        async with aiosqlite.connect("big.db") as db:
+            if mode == "fetchall":
+                cursor = await db.execute("SELECT * FROM users")
+                count = len(await cursor.fetchall())
+                await cursor.close()
+            else:
+                async for rows in mod.stream_batches(db, "SELECT * FROM users", batch_size=1_000):
+                    count += len(rows)
+        return count
+
+    start = time.perf_counter()
+    count = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10} {count:>9} rows {elapsed:8.3f} s  peak RSS {peak_mib:8.1f} MiB")
+
+
+def bench_streaming(rows=1_000_000):
+    seed("big.db", rows)
+    for mode in ("fetchall", "stream"):
+        subprocess.run([sys.executable, os.path.join(HERE, "bench.py"), "--rss-child", mode], check=True)
+
+
+# Sample how late a 1 ms timer fires while `workload` runs on the loop
+async def measure_lag(workload, interval=0.001):
+    loop = asyncio.get_running_loop()
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lags.append(loop.time() - expected)
+
+    tick = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    await workload()
+    done = True
+    await tick
+    return max(lags), sum(lags) / len(lags)
+
+
+def bench_offload(queries=20):
+    sync_mod = load("1-execute")
+    import db_offload
+    # DB-bound query: sqlite3 releases the GIL while it runs
+    query, params = "SELECT count(*) FROM users a JOIN users b ON a.age > b.age WHERE a.age > ?", (25,)
+
+    async def blocking():
+        for _ in range(queries):
+            with sync_mod.ExecuteQuery("users.db", query, params):
+                await asyncio.sleep(0)
+
+    async def offloaded():
+        async def one():
+            async with db_offload.AsyncExecuteQuery("users.db", query, params):
+                pass
+        await asyncio.gather(*(one() for _ in range(queries)))
+
+    for label, workload in [("sync ExecuteQuery on the loop", blocking),
+                            ("AsyncExecuteQuery (thread pool)", offloaded)]:
+        start = time.perf_counter()
+        worst, mean = asyncio.run(measure_lag(workload))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<34} {elapsed:7.3f} s  loop lag max {worst * 1000:8.2f} ms  mean {mean * 1000:7.2f} ms")
+    db_offload.default_offloader.shutdown()
+
+
+def bench_execute_stream(rows=200_000):
+    mod = load("1-execute")
+    seed("execute.db", rows)
+    query, params = "SELECT * FROM users WHERE age > ?", (25,)
+    for label, kwargs in [("eager (fetchall)", {}), ("stream, arraysize=1000", {"stream": True})]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = 0
+        with mod.ExecuteQuery("execute.db", query, params, **kwargs) as results:
+            for _ in results:
+                count += 1
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"ExecuteQuery {label:<24} {count} rows {elapsed:7.3f} s  peak {peak / 2**20:8.1f} MiB")
+
+
+def bench_keep_alive(number=5_000):
+    mod = load("0-databaseconnection")
+
+    def open_query(**kwargs):
+        with mod.DatabaseConnection("users.db", **kwargs) as conn:
+            conn.execute("SELECT * FROM users WHERE id = ?", (42,)).fetchone()
+
+    def nested(**kwargs):
+        with mod.DatabaseConnection("users.db", **kwargs):
+            open_query(**kwargs)
+
+    for label, fn, kwargs in [
+        ("connect per block", open_query, {}),
+        ("keep_alive", open_query, {"keep_alive": True}),
+        ("nested, connect per block", nested, {}),
+        ("nested, keep_alive", nested, {"keep_alive": True}),
+    ]:
+        t = timeit.timeit(lambda: fn(**kwargs), number=number)
+        print(f"DatabaseConnection {label:<28} {t / number * 1e6:10.3f} us/block")
+    mod.DatabaseConnection.close_idle()
+
+
+def bench_snapshot(rows=200_000, scans=5):
+    conn_mod = load("0-databaseconnection")
+    exec_mod = load("1-execute")
+    seed("snapshot.db", rows)
+    for readonly in (False, True):
+        label = "read-only snapshot" if readonly else "normal"
+        start = time.perf_counter()
+        for _ in range(scans):
+            with conn_mod.DatabaseConnection("snapshot.db", readonly=readonly) as conn:
+                conn.execute("SELECT SUM(LENGTH(email)), AVG(age) FROM users").fetchone()
+        native = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(scans):
+            with exec_mod.ExecuteQuery("snapshot.db", "SELECT * FROM users", stream=True,
+                                       readonly=readonly) as results:
+                for _ in results:
+                    pass
+        streamed = time.perf_counter() - start
+        print(f"{label:<20} aggregate scan {rows * scans / native:12,.0f} rows/s   "
+              f"ExecuteQuery scan {rows * scans / streamed:12,.0f} rows/s")
+
+
+def dict_row_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# Memory and build time of 1M rows as tuples, dicts and UserRow objects
+def bench_row_factory(rows=1_000_000):
+    mod = load("1-execute")
+    from user_row import user_row_factory
+    seed("rows.db", rows)
+    for label, factory in [("tuple", None), ("dict", dict_row_factory), ("UserRow", user_row_factory)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        with mod.ExecuteQuery("rows.db", "SELECT * FROM users", row_factory=factory) as results:
+            elapsed = time.perf_counter() - start
+            size = tracemalloc.get_traced_memory()[0]
+            count = len(results)
+        tracemalloc.stop()
+        print(f"{label:<8} rows: {count} in {elapsed:6.3f} s  {size / 2**20:8.1f} MiB  "
+              f"({size / count:6.1f} bytes/row)")
+
+
+BENCHMARKS = {
+    "async_pool": bench_async_pool,
+    "streaming": bench_streaming,
+    "offload": bench_offload,
+    "execute_stream": bench_execute_stream,
+    "keep_alive": bench_keep_alive,
+    "snapshot": bench_snapshot,
+    "row_factory": bench_row_factory,
+}
+
+
+def main(names):
+    sys.path.insert(0, HERE)
+    if names[:1] == ["--rss-child"]:
+        return rss_child(names[1])
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        seed("users.db")
+        for name in names or BENCHMARKS:
+            print(f"== {name}")
+            BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,94 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Runs blocking sqlite3 work on a dedicated thread pool so coroutines can
+# await it without stalling the event loop. Every worker thread keeps its
+# own connection per database, opened on first use.
+class QueryOffloader:
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="db-offload")
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    # Runs in a worker thread
+    def _connection(self, db_name):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(db_name)
+        if conn is None:
+            # check_same_thread=False only so shutdown() can close it
+            conn = conns[db_name] = sqlite3.connect(db_name, check_same_thread=False)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, db_name, fn, args):
+        return fn(self._connection(db_name), *args)
+
+    # Await fn(conn, *args) run on a worker thread's connection to db_name
+    async def run(self, db_name, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, db_name, fn, args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+default_offloader = QueryOffloader()
+
+
+# Execute one statement and return its rows. Writes are committed right
+# away: consecutive statements may run on different worker threads, so a
+# transaction must not stay open across calls.
+def execute(conn, query, params):
+    try:
+        rows = conn.execute(query, params).fetchall()
+        if conn.in_transaction:
+            conn.commit()
+        return rows
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+# async with counterpart of DatabaseConnection
+class AsyncDatabaseConnection:
+    def __init__(self, db_name, offloader=None):
+        self.db_name = db_name
+        self.offloader = offloader or default_offloader
+
+    async def execute(self, query, params=()):
+        return await self.offloader.run(self.db_name, execute, query, params)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+# async with counterpart of ExecuteQuery
+class AsyncExecuteQuery:
+    def __init__(self, db_name, query, params=None, offloader=None):
+        self.db_name = db_name
+        self.query = query
+        self.params = params or ()
+        self.offloader = offloader or default_offloader
+        self.results = None
+
+    async def __aenter__(self):
+        self.results = await self.offloader.run(self.db_name, execute, self.query, self.params)
+        return self.results
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Test suite for the context managers and coroutines in this directory.
+
+Includes tests for:
+- DatabaseConnection nesting and keep-alive (0-databaseconnection)
+- AsyncConnectionPool and run_queries (3-concurrent)
+"""
+
+import os
+import sys
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+import importlib
+import contextlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+# Never finishes on its own: counts forever
+ENDLESS_QUERY = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+    "SELECT count(*) FROM c"
+)
+
+_workdir = None
+_cwd = None
+
+
+def seed(db_path, n_users=100):
+    """Create a users table with `n_users` rows in db_path."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS users "
+        "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(n_users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def load(name):
+    """Import a numbered task script without echoing its demo output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return importlib.import_module(name)
+
+
+def setUpModule():
+    """Run every test (and the scripts' demos) against a throwaway users.db."""
+    global _workdir, _cwd
+    _workdir = tempfile.TemporaryDirectory()
+    _cwd = os.getcwd()
+    os.chdir(_workdir.name)
+    seed("users.db")
+
+
+def tearDownModule():
+    """Leave the temp dir and remove it."""
+    os.chdir(_cwd)
+    _workdir.cleanup()
+
+
+class TestDatabaseConnection(unittest.TestCase):
+    """
+    TestCase for DatabaseConnection re-entry, savepoints and keep-alive.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the 0-databaseconnection script."""
+        cls.DatabaseConnection = load("0-databaseconnection").DatabaseConnection
+
+    def tearDown(self):
+        """Close the keep-alive connections and undo the tests' writes."""
+        self.DatabaseConnection.close_idle()
+        conn = sqlite3.connect("users.db")
+        conn.execute("UPDATE users SET age = 18 + (id - 1) % 60")
+        conn.commit()
+        conn.close()
+
+    def age(self, user_id):
+        """Committed age of a user, read on a fresh connection."""
+        conn = sqlite3.connect("users.db")
+        age, = conn.execute("SELECT age FROM users WHERE id = ?", (user_id,)).fetchone()
+        conn.close()
+        return age
+
+    def test_commits_and_rolls_back(self):
+        """
+        Test that a clean block commits and a raising one rolls back.
+        """
+        with self.DatabaseConnection("users.db") as conn:
+            conn.execute("UPDATE users SET age = 90 WHERE id = 1")
+        with self.assertRaises(ValueError):
+            with self.DatabaseConnection("users.db") as conn:
+                conn.execute("UPDATE users SET age = 91 WHERE id = 1")
+                raise ValueError
+        self.assertEqual(self.age(1), 90)
+
+    def test_same_instance_reentered(self):
+        """
+        Test that re-entering one instance keeps the outer connection.
+        """
+        db = self.DatabaseConnection("users.db", keep_alive=True)
+        with db as outer:
+            with db as inner:
+                self.assertIs(inner, outer)
+            self.assertIs(db.conn, outer)
+            outer.execute("UPDATE users SET age = 92 WHERE id = 2")
+        self.assertIsNone(db.conn)
+        self.assertEqual(self.age(2), 92)
+
+    def test_failed_nested_block_is_rolled_back(self):
+        """
+        Test that a nested block that raised is undone while the outer
+        block's work is still committed.
+        """
+        with self.DatabaseConnection("users.db", keep_alive=True) as conn:
+            conn.execute("UPDATE users SET age = 93 WHERE id = 3")
+            with self.assertRaises(ValueError):
+                with self.DatabaseConnection("users.db", keep_alive=True) as nested:
+                    nested.execute("UPDATE users SET age = -1 WHERE id = 4")
+                    raise ValueError
+        self.assertEqual((self.age(3), self.age(4)), (93, 21))
+
+    def test_commit_inside_nested_block(self):
+        """
+        Test that committing inside a nested block does not make the exit
+        fail on the savepoint the commit released.
+        """
+        with self.DatabaseConnection("users.db", keep_alive=True) as conn:
+            with self.DatabaseConnection("users.db", keep_alive=True) as nested:
+                nested.execute("UPDATE users SET age = 94 WHERE id = 5")
+                nested.commit()
+            with self.DatabaseConnection("users.db", keep_alive=True) as nested:
+                nested.execute("UPDATE users SET age = 95 WHERE id = 6")
+                nested.commit()
+                nested.execute("UPDATE users SET age = 96 WHERE id = 6")
+            conn.execute("UPDATE users SET age = 97 WHERE id = 7")
+        self.assertEqual((self.age(5), self.age(6), self.age(7)), (94, 96, 97))
+
+
+class TestRunQueries(unittest.TestCase):
+    """
+    TestCase for run_queries and the AsyncConnectionPool it draws from.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the 3-concurrent script."""
+        cls.concurrent = load("3-concurrent")
+
+    def run_async(self, coro, timeout=10):
+        """Run `coro`, failing the test instead of hanging."""
+        return asyncio.run(asyncio.wait_for(coro, timeout))
+
+    def test_results_and_per_query_timeout(self):
+        """
+        Test that each query gets its own result and that a per-query
+        timeout only fails the query it belongs to.
+        """
+        async def go():
+            async with self.concurrent.AsyncConnectionPool("users.db", max_size=2) as pool:
+                return [r async for r in self.concurrent.run_queries(
+                    ["SELECT * FROM users", ("SELECT * FROM users WHERE age > ?", (60,)),
+                     (ENDLESS_QUERY, (), 0.2)],
+                    pool, limit=2,
+                )]
+
+        results = {r.query: r for r in self.run_async(go())}
+        self.assertEqual(len(results["SELECT * FROM users"].rows), 100)
+        self.assertEqual(len(results["SELECT * FROM users WHERE age > ?"].rows), 17)
+        self.assertIsInstance(results[ENDLESS_QUERY].error, asyncio.TimeoutError)
+        self.assertIsNone(results[ENDLESS_QUERY].rows)
+
+    def test_timed_out_connection_is_not_reused(self):
+        """
+        Test that a timed-out query is interrupted and its connection
+        closed, so later checkouts and pool.close() do not hang on it.
+        """
+        async def go():
+            pool = self.concurrent.AsyncConnectionPool("users.db", max_size=2)
+            results = [r async for r in self.concurrent.run_queries(
+                [(ENDLESS_QUERY, (), 0.2)], pool, limit=1
+            )]
+            self.assertIsInstance(results[0].error, asyncio.TimeoutError)
+            self.assertEqual(pool._idle, [])
+            for _ in range(2):
+                async with pool.connection(timeout=1) as db:
+                    cursor = await db.execute("SELECT count(*) FROM users")
+                    self.assertEqual(await cursor.fetchone(), (100,))
+            await pool.close()
+
+        self.run_async(go())
+
+    def test_cancelled_query_is_interrupted(self):
+        """
+        Test that closing run_queries early cancels a running query and
+        frees its pool slot.
+        """
+        async def go():
+            async with self.concurrent.AsyncConnectionPool("users.db", max_size=2) as pool:
+                results = self.concurrent.run_queries(
+                    ["SELECT 1", ENDLESS_QUERY], pool, limit=2
+                )
+                first = await results.__anext__()
+                self.assertEqual(first.rows, [(1,)])
+                await results.aclose()
+                async with pool.connection(timeout=1) as db, pool.connection(timeout=1) as other:
+                    cursor = await other.execute("SELECT 2")
+                    self.assertEqual(await cursor.fetchone(), (2,))
+
+        self.run_async(go())
+
+    def test_checkout_timeout_is_reported(self):
+        """
+        Test that a query that cannot get a connection in time reports
+        PoolTimeout instead of running.
+        """
+        async def go():
+            async with self.concurrent.AsyncConnectionPool("users.db", max_size=1, timeout=0.1) as pool:
+                async with pool.connection():
+                    return [r async for r in self.concurrent.run_queries(["SELECT 1"], pool)]
+
+        result, = self.run_async(go())
+        self.assertIsInstance(result.error, self.concurrent.PoolTimeout)
+        self.assertEqual(result.elapsed, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
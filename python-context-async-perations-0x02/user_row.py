@@ -0,0 +1,25 @@
+# Compact user record with attribute access for rows of the users table
+# (id, name, email, age); __slots__ keeps it much smaller than a dict
+class UserRow:
+    __slots__ = ("id", "name", "email", "age")
+
+    def __init__(self, id, name, email, age):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRow):
+            return NotImplemented
+        return (self.id, self.name, self.email, self.age) == \
+            (other.id, other.name, other.email, other.age)
+
+    def __repr__(self):
+        return f"UserRow(id={self.id!r}, name={self.name!r}, email={self.email!r}, age={self.age!r})"
+
+
+# sqlite3 row_factory building a UserRow from each `SELECT * FROM users` row
+def user_row_factory(cursor, row):
+    return UserRow(*row)
+
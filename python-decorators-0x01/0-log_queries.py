@@ -1,28 +1,96 @@
-import sqlite3
+import sys
+import json
+import time
+import queue
+import atexit
+import random
 import functools
+import threading
 from datetime import datetime
 
-# Decorator to log SQL queries with timestamps
-def log_queries(func):
+from db_pool import get_pool
+from query_stats import profile_query
+
+
+# Structured query log. The calling thread only times the query and hands a
+# tuple to a bounded queue; formatting and writing happen on a background
+# thread. When the queue is full records are dropped (and counted) rather
+# than blocking the query path.
+class QueryLogger:
+    def __init__(self, stream=None, max_queue=10_000, sample_rate=1.0, slow_ms=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.sample_rate = sample_rate  # fraction of ordinary queries logged
+        self.slow_ms = slow_ms  # queries at least this slow are always logged
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="query-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def should_log(self, duration_ms):
+        if self.slow_ms is not None and duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def log(self, query, params, duration_ms):
+        try:
+            self._queue.put_nowait((time.time(), query, params, duration_ms))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            ts, query, params, duration_ms = record
+            self.stream.write(json.dumps({
+                "ts": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"),
+                "query": query,
+                "params": params,
+                "duration_ms": round(duration_ms, 3),
+            }, default=str) + "\n")
+            if self._queue.empty():
+                self.stream.flush()
+
+    # Write out everything queued so far and stop the writer thread
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+query_logger = QueryLogger()
+
+# Decorator to log SQL queries with their params and duration.
+# Usable bare (@log_queries) or with a custom logger (@log_queries(logger=...)).
+def log_queries(func=None, *, logger=None):
+    if func is None:
+        return functools.partial(log_queries, logger=logger)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         query = kwargs.get("query") if "query" in kwargs else (args[0] if args else "<UNKNOWN QUERY>")
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Executing SQL Query: {query}")
-        return func(*args, **kwargs)
+        params = kwargs.get("params") if "params" in kwargs else (args[1] if len(args) > 1 else None)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            target = logger or query_logger
+            if target.should_log(duration_ms):
+                target.log(query, params, duration_ms)
     return wrapper
 
 @log_queries
+@profile_query
 def fetch_all_users(query):
-    conn = sqlite3.connect('users.db')
-    try:
+    with get_pool('users.db').connection() as conn:
         cursor = conn.cursor()
         cursor.execute(query)
         results = cursor.fetchall()
         return results
-    finally:
-        conn.close()
 
-# Fetch users while logging the query with timestamp
+# Fetch users while logging the query, params and duration
 users = fetch_all_users(query="SELECT * FROM users")
-print(users)
\ No newline at end of file
+print(users)
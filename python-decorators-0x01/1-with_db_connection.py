@@ -1,20 +1,19 @@
-import sqlite3 
 import functools
 
+from db_pool import get_pool
+from query_stats import profile_query
+
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Open connection
-        conn = sqlite3.connect("users.db")
-        try:
+        # Check a connection out of the shared pool
+        with get_pool("users.db").connection() as conn:
             # Pass the connection as the first argument to the function
             return func(conn, *args, **kwargs)
-        finally:
-            # Always close connection
-            conn.close()
     return wrapper 
 
 @with_db_connection 
+@profile_query(statement="SELECT * FROM users WHERE id = ?")
 def get_user_by_id(conn, user_id):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
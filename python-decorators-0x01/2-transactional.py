@@ -1,34 +1,22 @@
-import sqlite3
 import functools
+import itertools
+
+from db_pool import get_pool
+from query_stats import profile_query
+from query_cache import transactional
 
 
 def with_db_connection(func):
-    """Decorator to automatically open and close the DB connection"""
+    """Decorator to check a DB connection out of the pool and return it"""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
+        with get_pool("users.db").connection() as conn:
             return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper
-
-
-def transactional(func):
-    """Decorator to handle transactions (commit/rollback)"""
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)  # run the SQL logic
-            conn.commit()  # commit if no error
-            return result
-        except Exception as e:
-            conn.rollback()  # rollback if error
-            raise e
     return wrapper
 
 
 @with_db_connection
+@profile_query(statement="UPDATE users SET email = ? WHERE id = ?")
 @transactional
 def update_user_email(conn, user_id, new_email):
     cursor = conn.cursor()
@@ -37,6 +25,48 @@ def update_user_email(conn, user_id, new_email):
     )
 
 
+@transactional
+def update_email_chunks(conn, chunks):
+    """Apply chunks of (new_email, user_id) rows in one transaction"""
+    updated = 0
+    for chunk in chunks:
+        updated += conn.executemany(
+            "UPDATE users SET email = ? WHERE id = ?", chunk
+        ).rowcount
+    return updated
+
+
+@with_db_connection
+def update_user_emails(conn, updates, chunk_size=500, commit_every=None):
+    """Batched update_user_email for bulk migrations.
+
+    Applies an iterable of (user_id, new_email) pairs with executemany,
+    chunk_size rows at a time, through the same transactional decorator
+    as update_user_email. All chunks share one transaction unless
+    commit_every is given, in which case a transaction is committed every
+    commit_every rows (rounded up to whole chunks). A failing transaction
+    is rolled back; earlier ones stay committed. Returns the number of
+    rows updated. An empty input commits nothing.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    if commit_every is not None and commit_every < 0:
+        raise ValueError(f"commit_every must not be negative, got {commit_every}")
+    updates = iter(updates)
+    chunks = iter(
+        lambda: [(email, user_id) for user_id, email in itertools.islice(updates, chunk_size)],
+        [],
+    )
+    chunks_per_commit = -(-commit_every // chunk_size) if commit_every else None
+    updated = 0
+    first = next(chunks, None)
+    while first is not None:
+        rest = itertools.islice(chunks, chunks_per_commit - 1) if chunks_per_commit else chunks
+        updated += update_email_chunks(conn, itertools.chain([first], rest))
+        first = next(chunks, None)
+    return updated
+
+
 # Update user's email with automatic connection + transaction handling
 update_user_email(user_id=1, new_email="Crawford_Cartwright@hotmail.com")
 print("Email updated successfully")
@@ -1,40 +1,194 @@
 import time
-import sqlite3 
+import random
+import asyncio
+import sqlite3
 import functools
+import threading
+from collections import Counter, deque
+
+from db_pool import PoolTimeout, get_pool
 
 # Decorator to manage DB connection
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("example.db")  # or your desired DB file
-        try:
+        with get_pool("example.db").connection() as conn:  # or your desired DB file
             result = func(conn, *args, **kwargs)
             return result
-        finally:
-            conn.close()
     return wrapper
 
-# Decorator to retry on failure
-def retry_on_failure(retries=3, delay=2):
+# Only transient lock/busy errors are worth retrying; syntax errors,
+# missing tables etc. fail the same way every time
+TRANSIENT_ERRORS = ("database is locked", "database table is locked", "database is busy")
+
+def is_retryable(exc):
+    return isinstance(exc, sqlite3.OperationalError) and any(
+        message in str(exc).lower() for message in TRANSIENT_ERRORS
+    )
+
+# Caller bugs (bad SQL, constraint violations, unsupported values) fail the
+# same way however healthy the database is
+CALLER_ERRORS = (sqlite3.ProgrammingError, sqlite3.IntegrityError,
+                 sqlite3.DataError, sqlite3.NotSupportedError)
+
+# Failures that say the database is down or struggling: any operational or
+# database error that is not a caller bug (unable to open, disk I/O, locked
+# ...) and running out of pooled connections
+def is_db_failure(exc):
+    if isinstance(exc, CALLER_ERRORS):
+        return False
+    return isinstance(exc, (sqlite3.DatabaseError, PoolTimeout))
+
+# Exponential backoff with full jitter: uniform in [0, min(max_delay, delay * 2^n)]
+def backoff_delay(attempt, delay, max_delay):
+    return random.uniform(0, min(max_delay, delay * 2 ** (attempt - 1)))
+
+# Sleep before the next attempt, or None when the error should be raised
+def _next_sleep(exc, attempt, started, retries, delay, max_delay, max_elapsed, retry_if):
+    if attempt >= retries or not retry_if(exc):
+        return None
+    sleep = backoff_delay(attempt, delay, max_delay)
+    if max_elapsed is not None and time.monotonic() - started + sleep > max_elapsed:
+        return None
+    print(f"Attempt {attempt} failed with error: {exc}; retrying in {sleep:.3f}s")
+    return sleep
+
+# Decorator to retry transient failures with exponential backoff
+def retry_on_failure(retries=3, delay=2, max_delay=30, max_elapsed=None, retry_if=is_retryable):
+    if retries < 1:
+        raise ValueError(f"retries must be at least 1, got {retries}")
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
+            started = time.monotonic()
             for attempt in range(1, retries + 1):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    print(f"Attempt {attempt} failed with error: {e}")
-                    last_exception = e
-                    if attempt < retries:
-                        time.sleep(delay)
-            # Raise the last exception if all attempts fail
-            raise last_exception
+                    sleep = _next_sleep(e, attempt, started, retries, delay,
+                                        max_delay, max_elapsed, retry_if)
+                    if sleep is None:
+                        raise
+                    time.sleep(sleep)
+        return wrapper
+    return decorator
+
+# Same as retry_on_failure for coroutines; waits with asyncio.sleep so the
+# event loop keeps running between attempts
+def async_retry_on_failure(retries=3, delay=2, max_delay=30, max_elapsed=None, retry_if=is_retryable):
+    if retries < 1:
+        raise ValueError(f"retries must be at least 1, got {retries}")
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            for attempt in range(1, retries + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    sleep = _next_sleep(e, attempt, started, retries, delay,
+                                        max_delay, max_elapsed, retry_if)
+                    if sleep is None:
+                        raise
+                    await asyncio.sleep(sleep)
         return wrapper
     return decorator
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling through while the circuit is open"""
+
+
+# Circuit breaker over a sliding window of the last `window_size` calls.
+# Closed: calls go through. Open: calls fail fast with CircuitOpenError
+# until `reset_timeout` passes. Half-open: up to `half_open_calls` trial
+# calls; if they all succeed the circuit closes, any failure reopens it.
+# Only errors accepted by `failure_if` count as failures; by default that
+# is is_db_failure, so an unreachable database or an exhausted pool trips
+# it while caller bugs such as ProgrammingError or IntegrityError do not.
+# Put it outside retry_on_failure so a fully retried call counts once.
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window_size=20, min_calls=5, failure_rate=0.5,
+                 reset_timeout=30, half_open_calls=1,
+                 failure_if=is_db_failure):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.failure_if = failure_if
+        self.state = self.CLOSED
+        self.counters = Counter()  # "closed->open", "rejected", ...
+        self._window = deque(maxlen=window_size)  # True for a failed call
+        self._opened_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+
+    # Caller must hold the lock
+    def _transition(self, state):
+        self.counters[f"{self.state}->{state}"] += 1
+        self.state = state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        elif state == self.HALF_OPEN:
+            self._trials = self._trial_successes = 0
+        else:
+            self._window.clear()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError("circuit open, failing fast")
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError("circuit half-open, trial calls in flight")
+                self._trials += 1
+
+    def record(self, failed):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed:
+                    self._transition(self.OPEN)
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._transition(self.CLOSED)
+                return
+            if self.state != self.CLOSED:
+                return
+            self._window.append(failed)
+            if len(self._window) >= self.min_calls and \
+                    sum(self._window) / len(self._window) >= self.failure_rate:
+                self._transition(self.OPEN)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, **self.counters}
+
+    # Use the breaker itself as the decorator
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.record(self.failure_if(e))
+                raise
+            self.record(False)
+            return result
+        return wrapper
+
+db_breaker = CircuitBreaker(window_size=20, min_calls=5, failure_rate=0.5, reset_timeout=30)
+
+@db_breaker
 @with_db_connection
-@retry_on_failure(retries=3, delay=1)
+@retry_on_failure(retries=3, delay=1, max_elapsed=10)
 def fetch_users_with_retry(conn):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM users")
@@ -45,4 +199,5 @@ try:
     users = fetch_users_with_retry()
     print(users)
 except Exception as e:
-    print(f"Failed to fetch users after retries: {e}")
\ No newline at end of file
+    print(f"Failed to fetch users after retries: {e}")
+print(db_breaker.stats())
\ No newline at end of file
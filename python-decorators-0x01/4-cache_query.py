@@ -1,43 +1,65 @@
-import time
-import sqlite3 
 import functools
 
-query_cache = {}
+from db_pool import database_path, get_pool, track_tables
+from query_cache import make_cache_key, query_cache, transactional
+
+_MISSING = object()
 
 # Decorator to manage DB connection
 def with_db_connection(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("example.db")  # Replace with your actual DB path
-        try:
+        with get_pool("example.db").connection() as conn:  # Replace with your actual DB path
             return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
     return wrapper
 
-# Decorator to cache query results based on SQL query string
+# Decorator to cache query results based on the database, the normalized SQL
+# and its params.
+# The tables the query reads are recorded so that writes invalidate it.
 def cache_query(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
         query = kwargs.get('query') or (args[0] if args else None)
-        if query in query_cache:
+        params = kwargs.get('params') or (args[1] if len(args) > 1 else ())
+        key = make_cache_key(query, params, database_path(conn))
+        result = query_cache.get(key, _MISSING)
+        if result is not _MISSING:
             print(f"Using cached result for query: {query}")
-            return query_cache[query]
+            return result
         print(f"Executing and caching query: {query}")
-        result = func(conn, *args, **kwargs)
-        query_cache[query] = result
+        generation = query_cache.generation()
+        with track_tables(conn) as access:
+            result = func(conn, *args, **kwargs)
+        query_cache.set(key, result, tables=frozenset(access.read), generation=generation)
         return result
     return wrapper
 
 @with_db_connection
 @cache_query
-def fetch_users_with_cache(conn, query):
+def fetch_users_with_cache(conn, query, params=()):
     cursor = conn.cursor()
-    cursor.execute(query)
+    cursor.execute(query, params)
     return cursor.fetchall()
 
+@with_db_connection
+@transactional
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE users SET email = ? WHERE id = ?", (new_email, user_id)
+    )
+
 #### First call will cache the result
 users = fetch_users_with_cache(query="SELECT * FROM users")
 
 #### Second call will use the cached result
-users_again = fetch_users_with_cache(query="SELECT * FROM users")
\ No newline at end of file
+users_again = fetch_users_with_cache(query="SELECT * FROM users")
+
+#### Whitespace/case differences hit the same entry, params are part of the key
+users_again = fetch_users_with_cache(query="select *\n  from users")
+older_users = fetch_users_with_cache(query="SELECT * FROM users WHERE age > ?", params=(25,))
+
+#### A committed write to users drops the cached users queries
+update_user_email(user_id=1, new_email="Crawford_Cartwright@hotmail.com")
+users = fetch_users_with_cache(query="SELECT * FROM users")
+print(query_cache.stats())
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import timeit
+import sqlite3
+import tempfile
+import importlib
+import contextlib
+
+# Micro-benchmarks for the decorators in this directory.
+# Run with: python bench.py [name ...]
+# Every run works against throwaway users.db / example.db files in a temp dir.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+N_USERS = 10_000
+
+
+def seed(db_path, n_users=N_USERS):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS users "
+        "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(n_users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+# Import one of the numbered task scripts without echoing its demo output
+def load(name):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return importlib.import_module(name)
+
+
+def report(label, seconds, number):
+    print(f"{label:<40} {seconds / number * 1e6:10.3f} us/call")
+
+
+def bench_cache_keys(number=200_000):
+    mod = load("4-cache_query")
+    query = "SELECT * FROM users WHERE age > ?"
+    params = (25,)
+    raw = {query: []}
+    key = mod.make_cache_key(query, params)
+    keyed = {key: []}
+    report("raw dict lookup", timeit.timeit(lambda: raw.get(query), number=number), number)
+    report("make_cache_key", timeit.timeit(lambda: mod.make_cache_key(query, params), number=number), number)
+    report("make_cache_key + dict lookup",
+           timeit.timeit(lambda: keyed.get(mod.make_cache_key(query, params)), number=number), number)
+
+
+# Same decorator shape as the original with_db_connection: connect per call
+def unpooled(db_path):
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            conn = sqlite3.connect(db_path)
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+        return wrapper
+    return decorator
+
+
+def bench_pool(number=20_000):
+    mod = load("1-with_db_connection")
+    plain = unpooled("users.db")(mod.get_user_by_id.__wrapped__)
+    report("get_user_by_id (connect per call)", timeit.timeit(lambda: plain(user_id=42), number=number), number)
+    report("get_user_by_id (pooled)", timeit.timeit(lambda: mod.get_user_by_id(user_id=42), number=number), number)
+
+
+def bench_pragmas(number=2_000):
+    import db_pool
+    log_mod = load("0-log_queries")
+    conn_mod = load("1-with_db_connection")
+    fetch_all = log_mod.fetch_all_users.__wrapped__  # skip the logging
+    by_id = conn_mod.get_user_by_id
+    profiles = [
+        ("connect per call", None),
+        ("pooled, default", {}),
+        ("pooled, TUNED_PRAGMAS", {"pragmas": db_pool.TUNED_PRAGMAS, "cached_statements": 256}),
+    ]
+    for label, pool_kwargs in profiles:
+        if pool_kwargs is None:
+            plain_fetch_all = unpooled("users.db")(
+                lambda conn, query: conn.execute(query).fetchall()
+            )
+            plain_by_id = unpooled("users.db")(by_id.__wrapped__)
+            t_all = timeit.timeit(lambda: plain_fetch_all(query="SELECT * FROM users"), number=number // 10)
+            t_id = timeit.timeit(lambda: plain_by_id(user_id=42), number=number)
+        else:
+            db_pool.configure_pool("users.db", **pool_kwargs)
+            t_all = timeit.timeit(lambda: fetch_all(query="SELECT * FROM users"), number=number // 10)
+            t_id = timeit.timeit(lambda: by_id(user_id=42), number=number)
+        report(f"fetch_all_users ({label})", t_all, number // 10)
+        report(f"get_user_by_id ({label})", t_id, number)
+    db_pool.configure_pool("users.db")
+
+
+# The original log_queries: strftime + synchronous print on every call
+def print_logged(func):
+    def wrapper(*args, **kwargs):
+        from datetime import datetime
+        query = kwargs.get("query") if "query" in kwargs else (args[0] if args else "<UNKNOWN QUERY>")
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] Executing SQL Query: {query}")
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def bench_logging(number=50_000):
+    mod = load("0-log_queries")
+    noop = lambda query: None  # isolate the decorator overhead
+    with open(os.devnull, "w") as devnull:
+        original = print_logged(noop)
+        with contextlib.redirect_stdout(devnull):
+            t = timeit.timeit(lambda: original(query="SELECT 1"), number=number)
+        report("print + strftime (original)", t, number)
+        for label, kwargs in [
+            ("QueryLogger, every query", {}),
+            ("QueryLogger, 1% sampled", {"sample_rate": 0.01}),
+            ("QueryLogger, slow-only (>=50ms)", {"sample_rate": 0.0, "slow_ms": 50}),
+        ]:
+            logger = mod.QueryLogger(stream=devnull, max_queue=number + 1, **kwargs)
+            logged = mod.log_queries(noop, logger=logger)
+            t = timeit.timeit(lambda: logged(query="SELECT 1"), number=number)
+            report(label, t, number)
+            logger.close()
+
+
+def bench_profiling(number=200_000):
+    import query_stats
+    noop = lambda query: None
+    profiled = query_stats.profile_query(noop, registry=query_stats.QueryStats())
+    report("undecorated call", timeit.timeit(lambda: noop(query="SELECT 1"), number=number), number)
+    report("profile_query", timeit.timeit(lambda: profiled(query="SELECT 1"), number=number), number)
+
+    registry = query_stats.query_stats
+    registry.reset()
+    fetch_all = load("0-log_queries").fetch_all_users
+    by_id = load("1-with_db_connection").get_user_by_id
+    update = load("2-transactional").update_user_email
+    registry.reset()  # drop the calls made by the demo scripts
+    for i in range(200):
+        by_id(user_id=i + 1)
+        update(user_id=i + 1, new_email=f"new{i}@example.com")
+        if i % 20 == 0:
+            fetch_all.__wrapped__(query="SELECT * FROM users")
+    registry.dump()
+
+
+def bench_batched_updates(rows=2_000):
+    mod = load("2-transactional")
+    pairs = [(i + 1, f"migrated{i}@example.com") for i in range(rows)]
+    start = time.perf_counter()
+    for user_id, email in pairs[: rows // 10]:
+        mod.update_user_email(user_id=user_id, new_email=email)
+    per_row = time.perf_counter() - start
+    print(f"{'update_user_email, one tx per row':<40} {rows // 10 / per_row:12,.0f} rows/s")
+    for label, kwargs in [
+        ("update_user_emails, one tx", {}),
+        ("update_user_emails, commit every 500", {"commit_every": 500}),
+    ]:
+        start = time.perf_counter()
+        mod.update_user_emails(pairs, **kwargs)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<40} {rows / elapsed:12,.0f} rows/s")
+
+
+BENCHMARKS = {
+    "cache_keys": bench_cache_keys,
+    "pool": bench_pool,
+    "pragmas": bench_pragmas,
+    "logging": bench_logging,
+    "profiling": bench_profiling,
+    "batched_updates": bench_batched_updates,
+}
+
+
+def main(names):
+    sys.path.insert(0, HERE)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        seed("users.db")
+        seed("example.db")
+        for name in names or BENCHMARKS:
+            print(f"== {name}")
+            BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
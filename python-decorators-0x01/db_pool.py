@@ -0,0 +1,325 @@
+import time
+import sqlite3
+import functools
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+# Opt-in tuning profile, applied once to every new connection.
+# WAL lets readers run alongside a writer; NORMAL sync is safe under WAL.
+TUNED_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative means KiB, i.e. 64 MiB
+    "temp_store": "MEMORY",
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time"""
+
+
+class TableAccess:
+    """Tables read and written, as reported by SQLite's authorizer."""
+
+    __slots__ = ("read", "written")
+
+    def __init__(self):
+        self.read = set()
+        self.written = set()
+
+
+_WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+
+
+def _authorize(preparing, action, table, column, database, source):
+    access = preparing[0]
+    if access is not None and table and not table.startswith("sqlite_"):
+        if action == sqlite3.SQLITE_READ:
+            access.read.add(table.lower())
+        elif action in _WRITE_ACTIONS:
+            access.written.add(table.lower())
+    return sqlite3.SQLITE_OK
+
+
+# File of the main database of `conn`; in-memory databases are private to
+# their connection, so they get a name of their own
+def database_path(conn):
+    path = getattr(conn, "database", None)
+    if path is None:
+        path = conn.execute("PRAGMA database_list").fetchone()[2] or f":memory:{id(conn)}"
+    return path
+
+
+class TrackingCursor(sqlite3.Cursor):
+    """Cursor that reports the tables of each statement it runs."""
+
+    def execute(self, sql, parameters=()):
+        return self.connection._run(self, sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.connection._run(self, sqlite3.Cursor.executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.connection._run(self, sqlite3.Cursor.executescript, sql_script, None)
+
+
+class TrackingConnection(sqlite3.Connection):
+    """sqlite3 connection that knows which tables its statements touch.
+
+    The authorizer is installed once, when the connection opens. It only
+    fires while SQLite prepares a statement, so the tables it reports are
+    remembered per SQL string, in an LRU at least as large as sqlite3's
+    statement cache: every statement that cache can hand back without
+    preparing is still known here. Installing an authorizer expires the
+    prepared statements, so doing it once keeps the statement cache
+    useful. Inside ``track_tables`` blocks the tables of every statement
+    run are collected as ``(database_path, table)`` pairs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table_trackers = []  # TableAccess of the open track_tables blocks
+        self._statement_limit = max(kwargs.get("cached_statements", 128), 128)
+        self._statement_tables = OrderedDict()  # sql -> TableAccess
+        self._preparing = [None]  # TableAccess the authorizer fills in
+        self.set_authorizer(functools.partial(_authorize, self._preparing))
+        self.database = database_path(self)
+
+    def cursor(self, factory=TrackingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def _run(self, cursor, method, sql, parameters):
+        args = (sql,) if parameters is None else (sql, parameters)
+        tables = self._statement_tables.get(sql)
+        if tables is not None:
+            self._statement_tables.move_to_end(sql)
+            self._report(tables)
+            return method(cursor, *args)
+        tables = self._preparing[0] = TableAccess()
+        try:
+            result = method(cursor, *args)
+        finally:
+            self._preparing[0] = None
+            self._report(tables)
+        if parameters is not None:  # scripts bypass the statement cache
+            self._statement_tables[sql] = tables
+            if len(self._statement_tables) > self._statement_limit:
+                self._statement_tables.popitem(last=False)
+        return result
+
+    def _report(self, tables):
+        for access in self.table_trackers:
+            access.read.update((self.database, table) for table in tables.read)
+            access.written.update((self.database, table) for table in tables.written)
+
+
+# Record the tables statements on `conn` read and write while the block
+# runs, as (database_path, table) pairs. Blocks may nest (e.g. cache_query
+# inside transactional); each gets its own TableAccess. Pooled connections
+# are TrackingConnections; a plain sqlite3 connection gets the authorizer
+# for the duration of the outermost block, which expires its prepared
+# statements each time.
+@contextmanager
+def track_tables(conn):
+    if not isinstance(conn, TrackingConnection):
+        with _track_plain(conn) as access:
+            yield access
+        return
+    access = TableAccess()
+    conn.table_trackers.append(access)
+    try:
+        yield access
+    finally:
+        conn.table_trackers.remove(access)
+
+
+_plain_trackers = {}  # id(conn) -> stack of TableAccess being recorded
+
+
+def _authorize_each(stack, *args):
+    for access in stack:
+        _authorize([access], *args)
+    return sqlite3.SQLITE_OK
+
+
+@contextmanager
+def _track_plain(conn):
+    access = TableAccess()
+    stack = _plain_trackers.setdefault(id(conn), [])
+    stack.append(access)
+    if len(stack) == 1:
+        conn.set_authorizer(functools.partial(_authorize_each, stack))
+    try:
+        yield access
+    finally:
+        stack.remove(access)
+        if not stack:
+            del _plain_trackers[id(conn)]
+            conn.set_authorizer(None)
+        database = database_path(conn)
+        access.read = {(database, table) for table in access.read}
+        access.written = {(database, table) for table in access.written}
+
+
+class ConnectionPool:
+    """Fixed-size pool of sqlite3 connections shared between threads.
+
+    Idle connections are reused most-recently-used first, checked with a
+    cheap ``SELECT 1`` when they have been idle for a while, and closed once
+    they sit unused longer than ``idle_timeout``.
+
+    Because connections are long-lived, sqlite3's per-connection statement
+    cache (``cached_statements``) saves re-parsing repeated SQL. ``pragmas``
+    (e.g. ``TUNED_PRAGMAS``) are executed once when a connection is opened.
+    """
+
+    def __init__(self, db_path, max_size=5, timeout=5.0, idle_timeout=60.0,
+                 health_check_after=30.0, cached_statements=128, pragmas=None):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.pragmas = dict(pragmas or {})
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self._idle = deque()  # (conn, released_at), newest on the right
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=TrackingConnection,
+        )
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _healthy(self, conn):
+        try:
+            conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        self._size -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    # Caller must hold the lock
+    def _reap_idle(self, now):
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            self._discard(self._idle.popleft()[0])
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._reap_idle(now)
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"no connection to {self.db_path} available after {timeout}s"
+                        )
+                    self._cond.wait(remaining)
+            if conn is None:
+                break
+            # Health-check outside the lock so other checkouts are not blocked
+            if now - released_at < self.health_check_after or self._healthy(conn):
+                return conn
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()  # never hand out a connection mid-transaction
+        except sqlite3.Error:
+            with self._cond:
+                self._discard(conn)
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def __len__(self):
+        return self._size
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# Process-wide pool per database path, created on first use. Options only
+# apply when the pool is created; use configure_pool() to change them.
+def get_pool(db_path, **kwargs):
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path, **kwargs)
+        elif kwargs:
+            raise ValueError(
+                f"a pool for {db_path} already exists; use configure_pool() to change its options"
+            )
+        return pool
+
+
+# Replace the pool for a database path, e.g. to opt in to TUNED_PRAGMAS:
+#   configure_pool("users.db", pragmas=TUNED_PRAGMAS, cached_statements=256)
+def configure_pool(db_path, **kwargs):
+    pool = ConnectionPool(db_path, **kwargs)
+    with _pools_lock:
+        old = _pools.get(db_path)
+        _pools[db_path] = pool
+    if old is not None:
+        old.close()
+    return pool
@@ -0,0 +1,169 @@
+import re
+import time
+import functools
+import threading
+from collections import OrderedDict
+
+from db_pool import track_tables
+
+# Splits SQL into quoted literals / identifiers and the text between them;
+# comments are matched too but not captured, so they split as None
+_SQL_LITERAL = re.compile(
+    r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|--[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL
+)
+
+
+# Drop comments, then collapse whitespace and case outside of quoted
+# literals so that "select *  from USERS" and "SELECT * FROM users" share a
+# cache entry. Comments go first: collapsing the newline that ends a `--`
+# comment would turn the rest of the line into comment text.
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query):
+    parts = _SQL_LITERAL.split(query)
+    for i in range(0, len(parts), 2):
+        parts[i] = " ".join(parts[i].split()).lower()
+    for i in range(1, len(parts), 2):
+        if parts[i] is None:
+            parts[i] = " "  # a comment separates tokens like whitespace
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+# Build a hashable cache key from the database file, the normalized SQL and
+# its bound parameters
+def make_cache_key(query, params=(), database=None):
+    if params is None:
+        params = ()
+    elif isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    elif not isinstance(params, tuple):
+        params = tuple(params)
+    return (database, normalize_query(query), params)
+
+
+# Bounded LRU cache with per-entry TTL, safe to share between threads. Tables
+# are whatever track_tables records, i.e. (database_path, table) pairs, so
+# one cache can serve several database files.
+class QueryCache:
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, result, tables)
+        self._by_table = {}  # table -> set of keys that read it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Guards against a read that started before a commit storing its
+        # stale result after the commit invalidated the table: every
+        # invalidation ticks the clock and stamps the tables it touched.
+        self._clock = 0
+        self._generations = {}  # table -> clock at its last invalidation
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                # Expired entries are dropped lazily on lookup
+                self._discard(key)
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    # Snapshot to take before running a read and pass to set()
+    def generation(self):
+        return self._clock
+
+    # Store a result that depends on `tables`. Results with no known tables
+    # are never stored, and neither are results read before `generation`
+    # if one of their tables was invalidated since. Returns whether stored.
+    def set(self, key, result, ttl=None, tables=(), generation=None):
+        if not tables:
+            return False
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and any(
+                self._generations.get(table, 0) > generation for table in tables
+            ):
+                return False
+            self._discard(key)
+            self._entries[key] = (expires_at, result, tables)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    # Drop every entry that read one of the given tables
+    def invalidate_tables(self, tables):
+        with self._lock:
+            self._clock += 1
+            keys = set()
+            for table in tables:
+                self._generations[table] = self._clock
+                keys.update(self._by_table.get(table, ()))
+            for key in keys:
+                self._discard(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    # Caller must hold the lock
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table in entry[2]:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+query_cache = QueryCache(max_entries=256, ttl=300)
+
+
+# Decorator to handle transactions (commit/rollback). A successful commit
+# invalidates the cached reads of every table the transaction wrote to.
+def transactional(func):
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        with track_tables(conn) as access:
+            try:
+                result = func(conn, *args, **kwargs)  # run the SQL logic
+                conn.commit()  # commit if no error
+            except Exception:
+                conn.rollback()  # rollback if error
+                raise
+        if access.written:
+            query_cache.invalidate_tables(access.written)
+        return result
+    return wrapper
@@ -0,0 +1,125 @@
+import sys
+import time
+import sqlite3
+import bisect
+import functools
+import threading
+
+from query_cache import normalize_query
+
+# Histogram bucket upper bounds in nanoseconds: 1us .. ~70s, 4 buckets per
+# doubling, so a percentile read from the buckets is within ~19% of exact
+BUCKET_BOUNDS = [int(1000 * 2 ** (i / 4)) for i in range(105)]
+
+
+
+class StatementStats:
+    __slots__ = ("calls", "rows", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def percentile(self, pct):
+        target = self.calls * pct / 100
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                return min(BUCKET_BOUNDS[i], self.max_ns) if i < len(BUCKET_BOUNDS) else self.max_ns
+        return 0
+
+
+class QueryStats:
+    """Per-statement call counts, row counts and latency histograms"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, duration_ns, rows=0):
+        slot = bisect.bisect_left(BUCKET_BOUNDS, duration_ns)
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                stats = self._stats[statement] = StatementStats()
+            stats.calls += 1
+            stats.rows += rows
+            stats.total_ns += duration_ns
+            stats.buckets[slot] += 1
+            if duration_ns > stats.max_ns:
+                stats.max_ns = duration_ns
+
+    # Summary per statement, hottest (most total time) first; times in ms
+    def snapshot(self):
+        with self._lock:
+            items = list(self._stats.items())
+            summary = [
+                {
+                    "statement": statement,
+                    "calls": s.calls,
+                    "rows": s.rows,
+                    "total_ms": s.total_ns / 1e6,
+                    "mean_ms": s.total_ns / s.calls / 1e6,
+                    "p50_ms": s.percentile(50) / 1e6,
+                    "p95_ms": s.percentile(95) / 1e6,
+                    "p99_ms": s.percentile(99) / 1e6,
+                    "max_ms": s.max_ns / 1e6,
+                }
+                for statement, s in items
+            ]
+        return sorted(summary, key=lambda row: row["total_ms"], reverse=True)
+
+    def dump(self, stream=None):
+        stream = stream or sys.stdout
+        stream.write(f"{'calls':>8} {'rows':>10} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8}  statement\n")
+        for row in self.snapshot():
+            stream.write(
+                f"{row['calls']:>8} {row['rows']:>10} {row['total_ms']:>10.2f} "
+                f"{row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['p99_ms']:>8.3f}  {row['statement']}\n"
+            )
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    return len(result) if isinstance(result, list) else 1
+
+
+# Decorator recording latency and row counts per normalized statement.
+# The statement is taken from `statement=`, else the `query` argument,
+# else the function's qualified name. When the wrapped function gets a
+# connection first and returns nothing (a write), the rows it changed
+# (the sum of its cursors' rowcount, via total_changes) are recorded.
+def profile_query(func=None, *, statement=None, registry=None):
+    if func is None:
+        return functools.partial(profile_query, statement=statement, registry=registry)
+    label = normalize_query(statement) if statement else func.__qualname__
+    record = (registry or query_stats).record
+    clock = time.perf_counter_ns
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        query = kwargs.get("query")
+        conn = args[0] if args and isinstance(args[0], sqlite3.Connection) else None
+        changes = conn.total_changes if conn is not None else 0
+        start = clock()
+        result = func(*args, **kwargs)
+        duration = clock() - start
+        if result is None and conn is not None:
+            rows = conn.total_changes - changes
+        else:
+            rows = _row_count(result)
+        record(normalize_query(query) if query else label, duration, rows)
+        return result
+    return wrapper
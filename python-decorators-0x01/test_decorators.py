@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""
+Test suite for the decorators in this directory.
+
+Includes tests for:
+- QueryCache LRU, TTL and generation checks (query_cache)
+- ConnectionPool checkout, health checks and reaping (db_pool)
+- retry_on_failure and CircuitBreaker (3-retry_on_failure)
+- track_tables and write-aware invalidation (db_pool, query_cache)
+- normalize_query and make_cache_key (query_cache)
+- update_user_emails (2-transactional)
+"""
+
+import io
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+import importlib
+import contextlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+from db_pool import ConnectionPool, PoolTimeout, get_pool, track_tables  # noqa: E402
+from query_cache import QueryCache, make_cache_key, normalize_query, transactional  # noqa: E402
+
+_workdir = None
+_cwd = None
+
+
+def seed(db_path, n_users=100):
+    """Create a users table with `n_users` rows in db_path."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS users "
+        "(id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+        ((f"user{i}", f"user{i}@example.com", 18 + i % 60) for i in range(n_users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def load(name):
+    """Import a numbered task script without echoing its demo output."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return importlib.import_module(name)
+
+
+def setUpModule():
+    """Run every test (and the scripts' demos) against throwaway databases."""
+    global _workdir, _cwd
+    _workdir = tempfile.TemporaryDirectory()
+    _cwd = os.getcwd()
+    os.chdir(_workdir.name)
+    seed("users.db")
+    seed("example.db")
+
+
+def tearDownModule():
+    """Leave the temp dir and remove it."""
+    os.chdir(_cwd)
+    _workdir.cleanup()
+
+
+class TestQueryCache(unittest.TestCase):
+    """
+    TestCase for QueryCache eviction, expiry and invalidation.
+    """
+
+    def test_evicts_least_recently_used(self):
+        """
+        Test that a full cache drops the entry read least recently.
+        """
+        cache = QueryCache(max_entries=2)
+        cache.set("a", 1, tables={"users"})
+        cache.set("b", 2, tables={"users"})
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3, tables={"users"})
+        self.assertNotIn("b", cache)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        """
+        Test that an entry is a miss once its TTL has passed.
+        """
+        cache = QueryCache(ttl=60)
+        cache.set("short", 1, ttl=0.01, tables={"users"})
+        cache.set("long", 2, tables={"users"})
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), 2)
+        self.assertEqual(len(cache), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_untracked_results_are_not_stored(self):
+        """
+        Test that a result with no known tables is never cached, since no
+        write could invalidate it.
+        """
+        cache = QueryCache()
+        self.assertFalse(cache.set("key", 1))
+        self.assertNotIn("key", cache)
+
+    def test_invalidation_drops_readers_of_the_table(self):
+        """
+        Test that invalidating a table drops only the entries that read it.
+        """
+        cache = QueryCache()
+        cache.set("users", 1, tables={"users"})
+        cache.set("join", 2, tables={"users", "orders"})
+        cache.set("orders", 3, tables={"orders"})
+        self.assertEqual(cache.invalidate_tables({"users"}), 2)
+        self.assertEqual(cache.get("orders"), 3)
+        self.assertNotIn("join", cache)
+        self.assertEqual(cache.stats()["invalidations"], 2)
+
+    def test_read_racing_a_commit_is_not_stored(self):
+        """
+        Test that a result read before an invalidation of its table is
+        refused, while one read afterwards is stored.
+        """
+        cache = QueryCache()
+        before = cache.generation()
+        cache.invalidate_tables({"users"})
+        self.assertFalse(cache.set("key", "stale", tables={"users"}, generation=before))
+        self.assertNotIn("key", cache)
+        self.assertTrue(cache.set("other", 1, tables={"orders"}, generation=before))
+        self.assertTrue(cache.set("key", "fresh", tables={"users"}, generation=cache.generation()))
+        self.assertEqual(cache.get("key"), "fresh")
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    TestCase for ConnectionPool checkout, reuse, health checks and reaping.
+    """
+
+    def setUp(self):
+        """Start every test with a fresh two-connection pool on users.db."""
+        self.pool = ConnectionPool("users.db", max_size=2, timeout=0.05)
+        self.addCleanup(self.pool.close)
+
+    def test_reuses_released_connections(self):
+        """
+        Test that a released connection is handed out again, not reopened.
+        """
+        with self.pool.connection() as conn:
+            pass
+        with self.pool.connection() as again:
+            self.assertIs(again, conn)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_times_out_when_exhausted(self):
+        """
+        Test that checkout raises PoolTimeout once max_size connections
+        are out, and succeeds again after one is released.
+        """
+        first, second = self.pool.acquire(), self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_rolls_back_on_release(self):
+        """
+        Test that an open transaction is rolled back before reuse.
+        """
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE users SET age = -1 WHERE id = 1")
+        with self.pool.connection() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT age FROM users WHERE id = 1").fetchone(), (18,))
+
+    def test_health_check_discards_broken_connections(self):
+        """
+        Test that a connection failing its health check is replaced.
+        """
+        self.pool.health_check_after = 0
+        with self.pool.connection() as conn:
+            pass
+        conn.close()  # breaks it behind the pool's back
+        with self.pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+            self.assertEqual(fresh.execute("SELECT 1").fetchone(), (1,))
+        self.assertEqual(len(self.pool), 1)
+
+    def test_idle_connections_are_reaped(self):
+        """
+        Test that connections idle past idle_timeout are closed.
+        """
+        self.pool.idle_timeout = 0.01
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.pool.release(first)
+        self.pool.release(second)
+        time.sleep(0.02)
+        with self.pool.connection() as conn:
+            self.assertNotIn(conn, (first, second))
+        self.assertEqual(len(self.pool), 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            first.execute("SELECT 1")
+
+    def test_get_pool_options_apply_once(self):
+        """
+        Test that get_pool shares one pool per path and refuses options
+        for a pool that already exists.
+        """
+        pool = get_pool("example.db")
+        self.assertIs(get_pool("example.db"), pool)
+        with self.assertRaises(ValueError):
+            get_pool("example.db", max_size=10)
+
+
+class TestRetryOnFailure(unittest.TestCase):
+    """
+    TestCase for retry_on_failure and async_retry_on_failure.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the 3-retry_on_failure script."""
+        cls.retry = load("3-retry_on_failure")
+
+    def flaky(self, failures, error=sqlite3.OperationalError("database is locked")):
+        """A function failing `failures` times with `error`, then returning "ok"."""
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise error
+            return "ok"
+        return func, calls
+
+    def test_retries_transient_errors(self):
+        """
+        Test that lock errors are retried until the call succeeds.
+        """
+        func, calls = self.flaky(2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.retry.retry_on_failure(retries=3, delay=0)(func)(), "ok")
+        self.assertEqual(len(calls), 3)
+
+    def test_does_not_retry_other_errors(self):
+        """
+        Test that a missing table fails on the first attempt.
+        """
+        func, calls = self.flaky(1, sqlite3.OperationalError("no such table: users"))
+        with self.assertRaises(sqlite3.OperationalError):
+            self.retry.retry_on_failure(retries=3, delay=0)(func)()
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_after_retries(self):
+        """
+        Test that the last error is raised once the attempts are used up.
+        """
+        func, calls = self.flaky(5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.retry.retry_on_failure(retries=2, delay=0)(func)()
+        self.assertEqual(len(calls), 2)
+
+    def test_rejects_fewer_than_one_attempt(self):
+        """
+        Test that retries=0 raises instead of never calling the function.
+        """
+        for decorator in (self.retry.retry_on_failure, self.retry.async_retry_on_failure):
+            with self.assertRaises(ValueError):
+                decorator(retries=0)
+
+    def test_async_retries(self):
+        """
+        Test the coroutine variant retries the same way.
+        """
+        func, calls = self.flaky(1)
+
+        async def coro():
+            return func()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(self.retry.async_retry_on_failure(retries=2, delay=0)(coro)())
+        self.assertEqual((result, len(calls)), ("ok", 2))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    TestCase for CircuitBreaker state transitions and failure classification.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the 3-retry_on_failure script."""
+        cls.retry = load("3-retry_on_failure")
+
+    def breaker(self, **kwargs):
+        """A breaker that opens after 5 calls at a 50% failure rate."""
+        options = dict(window_size=10, min_calls=5, failure_rate=0.5, reset_timeout=60)
+        options.update(kwargs)
+        return self.retry.CircuitBreaker(**options)
+
+    def call(self, breaker, func, times):
+        """Call `func` through `breaker` `times` times, ignoring errors."""
+        guarded = breaker(func)
+        for _ in range(times):
+            with contextlib.suppress(Exception):
+                guarded()
+
+    def test_opens_when_database_cannot_be_opened(self):
+        """
+        Test that repeated "unable to open database file" errors open the
+        circuit and later calls fail fast.
+        """
+        breaker = self.breaker()
+
+        def fetch():
+            sqlite3.connect("/nonexistent/dir/x.db").execute("SELECT 1")
+
+        self.call(breaker, fetch, 6)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        with self.assertRaises(self.retry.CircuitOpenError):
+            breaker(fetch)()
+
+    def test_opens_on_pool_timeouts(self):
+        """
+        Test that running out of pooled connections counts as a failure.
+        """
+        pool = ConnectionPool("users.db", max_size=1, timeout=0.01)
+        held = pool.acquire()
+        breaker = self.breaker()
+
+        def fetch():
+            with pool.connection() as conn:
+                conn.execute("SELECT 1")
+
+        try:
+            self.call(breaker, fetch, 5)
+        finally:
+            pool.release(held)
+            pool.close()
+        self.assertEqual(breaker.state, breaker.OPEN)
+
+    def test_caller_bugs_do_not_open(self):
+        """
+        Test that ProgrammingError and IntegrityError leave it closed.
+        """
+        breaker = self.breaker()
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        conn.execute("INSERT INTO t VALUES (1)")
+
+        def duplicate():
+            conn.execute("INSERT INTO t VALUES (1)")
+
+        def misuse():
+            conn.execute("SELECT ?", (1, 2))
+
+        self.call(breaker, duplicate, 5)
+        self.call(breaker, misuse, 5)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_classification(self):
+        """
+        Test is_db_failure on the errors the breaker sees.
+        """
+        is_db_failure = self.retry.is_db_failure
+        self.assertTrue(is_db_failure(sqlite3.OperationalError("unable to open database file")))
+        self.assertTrue(is_db_failure(sqlite3.OperationalError("database is locked")))
+        self.assertTrue(is_db_failure(sqlite3.DatabaseError("database disk image is malformed")))
+        self.assertTrue(is_db_failure(PoolTimeout("no connection")))
+        self.assertFalse(is_db_failure(sqlite3.ProgrammingError("bad binding")))
+        self.assertFalse(is_db_failure(sqlite3.IntegrityError("UNIQUE constraint failed")))
+        self.assertFalse(is_db_failure(ValueError("not a database error")))
+
+    def test_half_open_closes_after_successful_trial(self):
+        """
+        Test open -> half_open -> closed once reset_timeout has passed and
+        the trial call succeeds.
+        """
+        breaker = self.breaker(reset_timeout=0.05)
+        self.call(breaker, self.fail_locked, 5)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        time.sleep(0.06)
+        self.assertEqual(breaker(lambda: "ok")(), "ok")
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        stats = breaker.stats()
+        self.assertEqual(stats["open->half_open"], 1)
+        self.assertEqual(stats["half_open->closed"], 1)
+
+    def test_half_open_failure_reopens(self):
+        """
+        Test that a failing trial call reopens the circuit.
+        """
+        breaker = self.breaker(reset_timeout=0.05)
+        self.call(breaker, self.fail_locked, 5)
+        time.sleep(0.06)
+        self.call(breaker, self.fail_locked, 1)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertEqual(breaker.stats()["half_open->open"], 1)
+
+    @staticmethod
+    def fail_locked():
+        """Fail like a write blocked by another connection."""
+        raise sqlite3.OperationalError("database is locked")
+
+
+class TestTableTracking(unittest.TestCase):
+    """
+    TestCase for track_tables on pooled connections and the cache keys
+    and invalidations built on it.
+    """
+
+    def setUp(self):
+        """Open a pool on each test database."""
+        self.users = ConnectionPool("users.db")
+        self.example = ConnectionPool("example.db")
+
+    def tearDown(self):
+        """Close the pools."""
+        self.users.close()
+        self.example.close()
+
+    def test_cached_statements_are_tracked(self):
+        """
+        Test that a statement served from sqlite3's statement cache still
+        reports its tables, qualified by the database file.
+        """
+        with self.users.connection() as conn:
+            for user_id in range(3):
+                with track_tables(conn) as access:
+                    conn.execute("SELECT name FROM users WHERE id = ?", (user_id,))
+                self.assertEqual(access.read, {(os.path.abspath("users.db"), "users")})
+                self.assertEqual(access.written, set())
+
+    def test_authorizer_is_installed_once(self):
+        """
+        Test that tracking does not touch the connection's authorizer, which
+        would expire its prepared statements.
+        """
+        with self.users.connection() as conn:
+            calls = []
+            original = conn.set_authorizer
+            try:
+                conn.set_authorizer = calls.append
+            except AttributeError:
+                self.skipTest("connection attributes are read-only")
+            with track_tables(conn):
+                conn.execute("SELECT 1 FROM users")
+            conn.set_authorizer = original
+            self.assertEqual(calls, [])
+
+    def test_nested_blocks_and_writes(self):
+        """
+        Test that nested blocks each see the statements run inside them.
+        """
+        with self.example.connection() as conn:
+            with track_tables(conn) as outer:
+                conn.execute("SELECT * FROM users").fetchall()
+                with track_tables(conn) as inner:
+                    conn.execute("UPDATE users SET age = age WHERE id = 1")
+            conn.rollback()
+        table = (os.path.abspath("example.db"), "users")
+        self.assertEqual(outer.read, {table})
+        self.assertEqual(outer.written, {table})
+        self.assertEqual(inner.written, {table})
+
+    def test_plain_connections_are_tracked(self):
+        """
+        Test the fallback for connections that did not come from a pool.
+        """
+        conn = sqlite3.connect("users.db")
+        with track_tables(conn) as access:
+            conn.execute("SELECT * FROM users").fetchall()
+        conn.close()
+        self.assertEqual(access.read, {(os.path.abspath("users.db"), "users")})
+
+    def test_keys_include_the_database(self):
+        """
+        Test that the same SQL against two files gets two cache keys.
+        """
+        self.assertNotEqual(
+            make_cache_key("SELECT * FROM users", (), "/a/users.db"),
+            make_cache_key("SELECT * FROM users", (), "/b/example.db"),
+        )
+
+    def test_writes_only_invalidate_their_database(self):
+        """
+        Test that a committed write to users.db keeps example.db's entries.
+        """
+        cache = QueryCache()
+        for pool in (self.users, self.example):
+            with pool.connection() as conn, track_tables(conn) as access:
+                rows = conn.execute("SELECT * FROM users").fetchall()
+            cache.set(make_cache_key("SELECT * FROM users", (), conn.database),
+                      rows, tables=frozenset(access.read))
+        with self.users.connection() as conn, track_tables(conn) as access:
+            transactional(lambda conn: conn.execute("UPDATE users SET age = age WHERE id = 1"))(conn)
+        self.assertEqual(cache.invalidate_tables(access.written), 1)
+        self.assertIn(make_cache_key("SELECT * FROM users", (), os.path.abspath("example.db")), cache)
+        self.assertNotIn(make_cache_key("SELECT * FROM users", (), os.path.abspath("users.db")), cache)
+
+
+class TestNormalizeQuery(unittest.TestCase):
+    """
+    TestCase for the SQL normalization behind cache keys.
+    """
+
+    def test_whitespace_and_case(self):
+        """
+        Test that formatting differences share one key.
+        """
+        self.assertEqual(normalize_query("select *\n  from USERS;"), "select * from users")
+        self.assertEqual(make_cache_key("SELECT * FROM users", [1]),
+                         make_cache_key("select * from users", (1,)))
+
+    def test_literals_are_kept(self):
+        """
+        Test that quoted text, including comment markers, is left alone.
+        """
+        self.assertIn("'A  -- b'", normalize_query("SELECT 'A  -- b' FROM t"))
+        self.assertNotEqual(normalize_query("SELECT 'A'"), normalize_query("SELECT 'a'"))
+
+    def test_line_comment_ends_at_newline(self):
+        """
+        Test that a -- comment ending before WHERE and one swallowing it
+        do not collide.
+        """
+        ended = "SELECT * FROM users -- c\nWHERE id = 1"
+        swallowed = "SELECT * FROM users -- c WHERE id = 1"
+        self.assertEqual(normalize_query(ended), "select * from users where id = 1")
+        self.assertEqual(normalize_query(swallowed), "select * from users")
+        self.assertNotEqual(make_cache_key(ended), make_cache_key(swallowed))
+
+    def test_block_comments(self):
+        """
+        Test that block comments are dropped and still separate tokens.
+        """
+        self.assertEqual(normalize_query("SELECT 1/* x */FROM t"), "select 1 from t")
+
+
+class TestUpdateUserEmails(unittest.TestCase):
+    """
+    TestCase for the batched email update.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the 2-transactional script."""
+        cls.transactional = load("2-transactional")
+
+    def emails(self, *user_ids):
+        """Current emails of the given users in users.db."""
+        conn = sqlite3.connect("users.db")
+        rows = conn.execute(
+            f"SELECT email FROM users WHERE id IN ({', '.join('?' * len(user_ids))}) ORDER BY id",
+            user_ids,
+        ).fetchall()
+        conn.close()
+        return [email for email, in rows]
+
+    def test_updates_in_chunks(self):
+        """
+        Test that every pair is applied and the updated count returned.
+        """
+        updates = [(user_id, f"batch{user_id}@example.com") for user_id in range(10, 17)]
+        self.assertEqual(self.transactional.update_user_emails(updates, chunk_size=3, commit_every=3), 7)
+        self.assertEqual(self.emails(10, 16), ["batch10@example.com", "batch16@example.com"])
+
+    def test_empty_input(self):
+        """
+        Test that nothing is updated for an empty input.
+        """
+        self.assertEqual(self.transactional.update_user_emails([]), 0)
+
+    def test_rejects_invalid_sizes(self):
+        """
+        Test that chunk_size < 1 and commit_every < 0 raise ValueError
+        instead of silently applying nothing.
+        """
+        updates = [(20, "a@example.com"), (21, "b@example.com")]
+        with self.assertRaises(ValueError):
+            self.transactional.update_user_emails(updates, chunk_size=0)
+        with self.assertRaises(ValueError):
+            self.transactional.update_user_emails(updates, commit_every=-1)
+        self.assertEqual(self.emails(20, 21), ["user19@example.com", "user20@example.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
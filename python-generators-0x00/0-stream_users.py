@@ -0,0 +1,15 @@
+import itertools
+
+seed = __import__('seed')
+
+
+# Yields the rows of user_data one by one, as dicts or, with a row_factory
+# such as seed.UserRow, as row_factory(user_id, name, email, age); rows are
+# pulled from the server `batch_size` at a time
+def stream_users(batch_size=1000, row_factory=None):
+    rows = seed.stream_rows(
+        "SELECT user_id, name, email, age FROM user_data",
+        batch_size=batch_size,
+        dictionary=row_factory is None,
+    )
+    yield from (rows if row_factory is None else itertools.starmap(row_factory, rows))
@@ -0,0 +1,27 @@
+from user_batch import UserBatch, older_than
+
+seed = __import__('seed')
+
+
+# Yields lists of at most batch_size user dicts, or UserBatch objects when
+# columnar=True
+def stream_users_in_batches(batch_size, columnar=False):
+    batches = seed.stream_query(
+        "SELECT user_id, name, email, age FROM user_data",
+        batch_size=batch_size,
+        dictionary=not columnar,
+    )
+    yield from (map(UserBatch.from_rows, batches) if columnar else batches)
+
+
+# Yields the batches with only the users older than min_age
+def filter_batches(batches, min_age=25):
+    for batch in batches:
+        yield older_than(batch, min_age)
+
+
+# Prints the users over the age of 25, processed batch by batch
+def batch_processing(batch_size, columnar=False):
+    for batch in filter_batches(stream_users_in_batches(batch_size, columnar)):
+        for user in (batch.rows() if columnar else batch):
+            print(user)
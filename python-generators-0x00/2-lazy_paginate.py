@@ -0,0 +1,35 @@
+from operator import itemgetter
+
+from pagination import keyset_pages, read_ahead
+
+seed = __import__('seed')
+
+
+# Fetches one page of users in user_id order (LIMIT/OFFSET: cost grows
+# with the offset)
+def paginate_users(page_size, offset):
+    connection = seed.open_prodev()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT user_id, name, email, age FROM user_data ORDER BY user_id LIMIT %s OFFSET %s",
+        (page_size, offset),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    connection.close()
+    return rows
+
+
+# Yields pages of users, fetching the next page only when it is needed.
+# With prefetch=k a background thread keeps up to k pages fetched ahead
+# while the caller works on the current one; closing the generator early
+# stops the thread.
+def lazy_paginate(page_size, cursor=None, prefetch=0):
+    pages = map(itemgetter(0), keyset_pages(page_size, cursor))
+    if prefetch:
+        pages = read_ahead(pages, prefetch)
+    for page in pages:
+        yield page
+
+
+lazy_pagination = lazy_paginate
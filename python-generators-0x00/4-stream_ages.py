@@ -0,0 +1,20 @@
+seed = __import__('seed')
+
+
+# Yields user ages one by one
+def stream_user_ages(batch_size=1000):
+    for (age,) in seed.stream_rows("SELECT age FROM user_data", batch_size=batch_size, dictionary=False):
+        yield age
+
+
+# Average age computed from the stream, without loading all rows
+def average_age():
+    total = count = 0
+    for age in stream_user_ages():
+        total += age
+        count += 1
+    return total / count if count else 0
+
+
+if __name__ == "__main__":
+    print(f"Average age of users: {average_age()}")
@@ -0,0 +1,125 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import seed
+
+
+# Mergeable running statistics (count, mean, variance, min, max) using
+# Welford's update per value and Chan et al.'s formula to merge partials,
+# so shards can be aggregated separately and combined exactly.
+# `last_seq` is the highest user_data.seq folded in so far (see
+# update_age_stats for what that watermark can miss).
+class AgeStats:
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=None, max=None, last_seq=0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2  # sum of squared deviations from the mean
+        self.min = min
+        self.max = max
+        self.last_seq = last_seq
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        last_seq = max(self.last_seq, other.last_seq)
+        if not other.count:
+            self.last_seq = last_seq
+            return self
+        if not self.count:
+            self.__dict__.update(other.__dict__, last_seq=last_seq)
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.last_seq = max(self.last_seq, other.last_seq)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+    def __repr__(self):
+        return (f"AgeStats(count={self.count}, mean={self.mean:.4f}, variance={self.variance:.4f}, "
+                f"min={self.min}, max={self.max}, last_seq={self.last_seq})")
+
+
+# Aggregates the ages of rows with after_seq < seq <= until_seq (no upper
+# bound when until_seq is None)
+def age_stats(after_seq=0, until_seq=None, batch_size=1000):
+    query = "SELECT seq, age FROM user_data WHERE seq > %s"
+    params = (after_seq,)
+    if until_seq is not None:
+        query += " AND seq <= %s"
+        params += (until_seq,)
+    stats = AgeStats(last_seq=after_seq)
+    for seq, age in seed.stream_rows(query, params, batch_size, dictionary=False):
+        stats.add(age)
+        if seq > stats.last_seq:
+            stats.last_seq = seq
+    return stats
+
+
+# Splits the rows with seq > after_seq into `shards` contiguous
+# (after_seq, until_seq] ranges, so each shard is one index range scan
+def seq_ranges(shards, after_seq=0):
+    connection = seed.open_prodev()
+    cursor = connection.cursor()
+    cursor.execute("SELECT MIN(seq), MAX(seq) FROM user_data WHERE seq > %s", (after_seq,))
+    low, high = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    if low is None:
+        return []
+    low -= 1
+    step = -(-(high - low) // shards)
+    return [(bound, min(bound + step, high)) for bound in range(low, high, step)]
+
+
+# Aggregates `shards` seq ranges concurrently, each on its own connection,
+# and merges the partial states
+def parallel_age_stats(shards=4, after_seq=0):
+    with ThreadPoolExecutor(shards) as pool:
+        partials = pool.map(lambda bounds: age_stats(*bounds), seq_ranges(shards, after_seq))
+        total = AgeStats(last_seq=after_seq)
+        for partial in partials:
+            total.merge(partial)
+    return total
+
+
+# Brings the statistics persisted in `state_path` up to date by folding in
+# only the rows added since the last run, then saves them again.
+# Limits of the seq watermark: InnoDB hands out AUTO_INCREMENT values when
+# a row is inserted, not when it commits, so a transaction still open
+# during a run can later commit rows below the recorded last_seq, and
+# those rows are never counted. Rows updated or deleted after they were
+# folded in are not reflected either. Run it when no load is in progress,
+# or delete the state file to rebuild from a full scan when the table has
+# been changed in place.
+def update_age_stats(state_path="age_stats.json"):
+    stats = AgeStats()
+    if os.path.exists(state_path):
+        with open(state_path) as state_file:
+            stats = AgeStats.from_dict(json.load(state_file))
+    stats.merge(age_stats(after_seq=stats.last_seq))
+    with open(state_path, "w") as state_file:
+        json.dump(stats.to_dict(), state_file)
+    return stats
@@ -0,0 +1,215 @@
+import os
+import csv
+import sys
+import time
+import tempfile
+import uuid
+import random
+import resource
+import itertools
+import tracemalloc
+
+seed = __import__('seed')
+pagination = __import__('pagination')
+aggregates = __import__('aggregates')
+parallel_scan = __import__('parallel_scan')
+
+# Throughput / memory benchmarks for the user_data streaming pipeline.
+# Needs a reachable MySQL server (see seed.DB_CONFIG).
+# Run with: python bench.py [rows ...]   (default: 1000000 10000000)
+# user_data is topped up with synthetic rows to each requested size.
+#      or:  python bench.py load [rows]  (bulk CSV load, default 2000000)
+
+
+def top_up(rows, chunk_size=10_000):
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    missing = rows - count_rows()
+    while missing > 0:
+        n = min(chunk_size, missing)
+        cursor.executemany(
+            "INSERT INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)",
+            [
+                (str(uuid.uuid4()), f"user{i}", f"user{i}.{uuid.uuid4().hex[:8]}@example.com", random.randint(18, 100))
+                for i in range(n)
+            ],
+        )
+        connection.commit()
+        missing -= n
+    cursor.close()
+    connection.close()
+
+
+# Drain `generator`, reporting rows/s and Python heap peak
+def measure(label, generator, rows_of=lambda item: 1):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sum(rows_of(item) for item in generator)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<36} {count:>10} rows {count / elapsed:12,.0f} rows/s  heap peak {peak / 2**20:8.2f} MiB")
+
+
+# Latency of fetching page `page` by OFFSET vs by keyset cursor
+def bench_deep_page(page_size=1000, page=1000):
+    paging = __import__('2-lazy_paginate')
+    cursor = None
+    for _, cursor in itertools.islice(pagination.keyset_pages(page_size), page - 1):
+        pass
+    if cursor is None:
+        print(f"fewer than {page} pages of {page_size}, skipping deep-page benchmark")
+        return
+    start = time.perf_counter()
+    paging.paginate_users(page_size, (page - 1) * page_size)
+    offset_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    pagination.paginate_users_after(page_size, cursor)
+    keyset_ms = (time.perf_counter() - start) * 1000
+    print(f"page {page} of {page_size}: OFFSET {offset_ms:8.2f} ms   keyset {keyset_ms:8.2f} ms")
+
+
+# Bulk-load a generated CSV of `rows` users through seed.insert_data
+def bench_load(rows=2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "user_data.csv")
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["name", "email", "age"])
+            writer.writerows(
+                (f"user{i}", f"load{i}.{uuid.uuid4().hex[:8]}@example.com", random.randint(18, 100))
+                for i in range(rows)
+            )
+        connection = seed.connect_to_prodev()
+        for defer_indexes in (False, True):
+            start = time.perf_counter()
+            inserted = seed.insert_data(connection, path, defer_indexes=defer_indexes)
+            elapsed = time.perf_counter() - start
+            print(f"insert_data(defer_indexes={defer_indexes}): {inserted:,} new rows in {elapsed:.1f} s "
+                  f"({rows / elapsed:,.0f} rows/s read), max RSS "
+                  f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM user_data WHERE email LIKE 'load%'")
+            connection.commit()
+            cursor.close()
+        connection.close()
+
+
+# Full-scan aggregate vs incremental update after `new_rows` inserts
+def bench_aggregates(new_rows=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, "age_stats.json")
+        aggregates.update_age_stats(state_path)
+        top_up(count_rows() + new_rows)
+        start = time.perf_counter()
+        incremental = aggregates.update_age_stats(state_path)
+        incremental_s = time.perf_counter() - start
+    start = time.perf_counter()
+    full = aggregates.age_stats()
+    full_s = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = aggregates.parallel_age_stats(4)
+    parallel_s = time.perf_counter() - start
+    for stats in (incremental, parallel):
+        assert stats.count == full.count and stats.min == full.min and stats.max == full.max
+        assert abs(stats.mean - full.mean) < 1e-9 and abs(stats.variance - full.variance) < 1e-6
+    print(f"age stats: full scan {full_s:.3f} s, 4 shards {parallel_s:.3f} s, "
+          f"incremental (+{new_rows} rows) {incremental_s:.3f} s -> {full_s / incremental_s:,.0f}x; {full}")
+
+
+# Parallel key-range scan at 1, 2, 4, ... workers up to the core count
+def bench_parallel_scan():
+    batches = __import__('1-batch_processing')
+    cores = os.cpu_count() or 1
+    counts = sorted({1, cores} | {2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores})
+    start = time.perf_counter()
+    baseline = sum(len(batch) for batch in batches.filter_batches(batches.stream_users_in_batches(1000)))
+    single = time.perf_counter() - start
+    print(f"filter_batches, single process      {single:8.3f} s  ({baseline} users)")
+    for workers in counts:
+        for ordered in (True, False):
+            start = time.perf_counter()
+            found = sum(len(batch) for batch in parallel_scan.parallel_batch_processing(workers, ordered))
+            elapsed = time.perf_counter() - start
+            assert found == baseline
+            print(f"parallel, {workers:>2} workers, {'ordered' if ordered else 'unordered':<9}  "
+                  f"{elapsed:8.3f} s  speedup {single / elapsed:5.2f}x")
+
+
+# Dict-per-row vs columnar batches: filter + mean throughput, bytes/row
+def bench_columnar(batch_size=10_000):
+    batches = __import__('1-batch_processing')
+    for columnar in (False, True):
+        label = "UserBatch (columnar)" if columnar else "list of dicts"
+        start = time.perf_counter()
+        total = count = 0
+        for batch in batches.filter_batches(batches.stream_users_in_batches(batch_size, columnar)):
+            if columnar:
+                total += batch.mean_age() * len(batch)
+            else:
+                total += sum(float(user["age"]) for user in batch)
+            count += len(batch)
+        elapsed = time.perf_counter() - start
+        # Bytes to hold one batch in each layout (strings are shared with the
+        # sample, so this is the per-row container overhead)
+        sample = next(batches.stream_users_in_batches(batch_size, columnar))
+        tracemalloc.start()
+        copy = batches.UserBatch.from_rows(
+            list(zip(sample.user_id, sample.name, sample.email, sample.age))
+        ) if columnar else [dict(user) for user in sample]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label:<22} filter+mean {count / elapsed:12,.0f} rows/s  "
+              f"{size / len(sample):7.1f} bytes/row  mean age {total / max(count, 1):.2f}")
+        del copy
+
+
+# End-to-end time for a consumer spending `work` seconds per page
+def bench_prefetch(page_size=1000, pages=50, work=0.01):
+    paging = __import__('2-lazy_paginate')
+    for prefetch in (0, 1, 4):
+        start = time.perf_counter()
+        for page in itertools.islice(paging.lazy_paginate(page_size, prefetch=prefetch), pages):
+            time.sleep(work)
+        elapsed = time.perf_counter() - start
+        print(f"lazy_paginate(prefetch={prefetch}), {pages} pages, {work * 1000:.0f} ms/page consumer: {elapsed:7.3f} s")
+
+
+def count_rows():
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    connection.close()
+    return count
+
+
+def run(rows):
+    stream_users = __import__('0-stream_users').stream_users
+    batches = __import__('1-batch_processing')
+    lazy_paginate = __import__('2-lazy_paginate').lazy_paginate
+    stream_user_ages = __import__('4-stream_ages').stream_user_ages
+
+    top_up(rows)
+    print(f"== user_data with {rows:,} rows")
+    measure("stream_users", stream_users())
+    measure("stream_users(row_factory=UserRow)", stream_users(row_factory=seed.UserRow))
+    measure("stream_users_in_batches(1000)", batches.stream_users_in_batches(1000), len)
+    measure("filter_batches(age > 25)", batches.filter_batches(batches.stream_users_in_batches(1000)), len)
+    measure("lazy_paginate(1000), first 100 pages", itertools.islice(lazy_paginate(1000), 100), len)
+    measure("stream_user_ages", stream_user_ages())
+    bench_deep_page()
+    bench_aggregates()
+    bench_parallel_scan()
+    bench_columnar()
+    bench_prefetch()
+    print(f"max RSS so far {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["load"]:
+        bench_load(*[int(arg) for arg in sys.argv[2:3]])
+        sys.exit()
+    for rows in [int(arg) for arg in sys.argv[1:]] or [1_000_000, 10_000_000]:
+        run(rows)
@@ -0,0 +1,101 @@
+import queue
+import base64
+import threading
+
+import seed
+
+
+# Opaque resume cursors wrap the last user_id of a page
+def encode_cursor(user_id):
+    return base64.urlsafe_b64encode(user_id.encode()).decode()
+
+
+def decode_cursor(cursor):
+    return base64.urlsafe_b64decode(cursor.encode()).decode()
+
+
+# Keyset (seek) pagination: fetches the page after `cursor` in user_id
+# order by seeking on the primary key, so every page costs O(page_size)
+# however deep it is. Returns (rows, next_cursor); next_cursor is None on
+# the last page.
+def paginate_users_after(page_size, cursor=None):
+    if page_size < 1:
+        raise ValueError(f"page_size must be at least 1, got {page_size}")
+    connection = seed.open_prodev()
+    db_cursor = connection.cursor(dictionary=True)
+    if cursor is None:
+        db_cursor.execute(
+            "SELECT user_id, name, email, age FROM user_data ORDER BY user_id LIMIT %s",
+            (page_size,),
+        )
+    else:
+        db_cursor.execute(
+            "SELECT user_id, name, email, age FROM user_data WHERE user_id > %s "
+            "ORDER BY user_id LIMIT %s",
+            (decode_cursor(cursor), page_size),
+        )
+    rows = db_cursor.fetchall()
+    db_cursor.close()
+    connection.close()
+    next_cursor = encode_cursor(rows[-1]["user_id"]) if len(rows) == page_size else None
+    return rows, next_cursor
+
+
+# Yields (page, next_cursor) pairs, starting after `cursor` if given;
+# next_cursor can be stored to resume later
+def keyset_pages(page_size, cursor=None):
+    while True:
+        page, cursor = paginate_users_after(page_size, cursor)
+        if page:
+            yield page, cursor
+        if cursor is None:
+            break
+
+
+_DONE = object()
+
+
+# Background reader for read_ahead: moves items from `iterator` into a
+# queue of at most `depth` items. A full queue blocks the reader
+# (backpressure); setting `stop` makes it give up.
+def _fill(iterator, items, stop):
+    try:
+        for item in iterator:
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+        items.put(_DONE)
+    except Exception as e:
+        items.put(e)
+
+
+# Yields the items of `iterable` while a background thread keeps up to
+# `depth` of them fetched ahead of the consumer. Errors raised by the
+# iterable are re-raised here; closing the generator early stops the
+# thread.
+def read_ahead(iterable, depth):
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    reader = threading.Thread(target=_fill, args=(iter(iterable), items, stop), daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Free a slot so a reader blocked on a full queue notices right away
+        try:
+            items.get_nowait()
+        except queue.Empty:
+            pass
+        reader.join()
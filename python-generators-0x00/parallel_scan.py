@@ -0,0 +1,97 @@
+import os
+import queue
+import functools
+import itertools
+import collections
+import multiprocessing
+
+import seed
+from user_batch import older_than
+
+
+# Splits the user_id (UUID) key space into `parts` contiguous ranges of
+# hex prefixes, as (low, high) bounds; None means unbounded. Prefixes get
+# longer as parts grows so every range stays non-empty.
+def key_ranges(parts):
+    width = min(max(4, len(f"{parts:x}") + 1), 8)
+    space = 16 ** width
+    bounds = [None] + [f"{i * space // parts:0{width}x}" for i in range(1, parts)] + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+# Row count of user_data from the table statistics: an estimate, but free,
+# where COUNT(*) would scan the table before the scan even starts
+def estimate_users():
+    connection = seed.open_prodev()
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT table_rows FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = 'user_data'"
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    return int(row[0] or 0) if row else 0
+
+
+_connection = None  # the worker process's connection, see _open_connection
+
+
+# Pool initializer: every worker opens one connection and scans all of its
+# ranges on it. It is closed when the worker process exits.
+def _open_connection():
+    global _connection
+    _connection = seed.open_prodev()
+
+
+# Streams one key range in user_id order and returns the users older than
+# min_age. Runs in a worker process, on the worker's connection.
+def scan_range(key_range, min_age=25, batch_size=1000):
+    low, high = key_range
+    conditions, params = [], []
+    if low is not None:
+        conditions.append("user_id >= %s")
+        params.append(low)
+    if high is not None:
+        conditions.append("user_id < %s")
+        params.append(high)
+    query = "SELECT user_id, name, email, age FROM user_data"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    batches = seed.stream_query(query + " ORDER BY user_id", tuple(params), batch_size,
+                                connection=_connection)
+    return [user for batch in batches for user in older_than(batch, min_age)]
+
+
+# Parallel batch_processing: scans user_data by user_id range across a
+# pool of worker processes, each with one connection, and yields one
+# filtered batch per range. The key space is cut into ranges of about
+# batch_size rows (user_ids are uniformly distributed UUIDs), and at most
+# `window` ranges per worker are in flight, so the parent never holds more
+# than that many batches however slowly they are consumed. With
+# ordered=True batches come back in user_id order, otherwise as soon as
+# each range finishes.
+def parallel_batch_processing(workers=None, ordered=True, min_age=25, batch_size=1000,
+                              window=2):
+    workers = workers or os.cpu_count()
+    scan = functools.partial(scan_range, min_age=min_age, batch_size=batch_size)
+    ranges = iter(key_ranges(max(workers, -(-estimate_users() // batch_size))))
+    done = queue.Queue()
+
+    def submit(key_range):
+        if ordered:
+            return pool.apply_async(scan, (key_range,))
+        return pool.apply_async(scan, (key_range,), callback=done.put, error_callback=done.put)
+
+    with multiprocessing.Pool(workers, initializer=_open_connection) as pool:
+        pending = collections.deque(map(submit, itertools.islice(ranges, workers * window)))
+        while pending:
+            if ordered:
+                batch = pending.popleft().get()
+            else:
+                pending.pop()
+                batch = done.get()
+                if isinstance(batch, BaseException):
+                    raise batch
+            pending.extend(map(submit, itertools.islice(ranges, 1)))
+            yield batch
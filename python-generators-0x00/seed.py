@@ -0,0 +1,218 @@
+import os
+import re
+import csv
+import uuid
+import sqlite3
+import itertools
+
+import mysql.connector
+
+# Connection settings, overridable from the environment
+DB_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "localhost"),
+    "port": int(os.getenv("MYSQL_PORT", "3306")),
+    "user": os.getenv("MYSQL_USER", "root"),
+    "password": os.getenv("MYSQL_PASSWORD", ""),
+}
+DB_NAME = "ALX_prodev"
+
+
+# Connects to the MySQL server
+def connect_db():
+    try:
+        return mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as err:
+        print(f"Error connecting to MySQL: {err}")
+        return None
+
+
+# Creates the ALX_prodev database if it does not exist
+def create_database(connection):
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+    cursor.close()
+
+
+# Connects to the ALX_prodev database
+def connect_to_prodev():
+    try:
+        return open_prodev()
+    except mysql.connector.Error as err:
+        print(f"Error connecting to {DB_NAME}: {err}")
+        return None
+
+
+# Same as connect_to_prodev, but raises the connector's error instead of
+# printing it and returning None; used by the streaming pipeline
+def open_prodev():
+    return mysql.connector.connect(database=DB_NAME, **DB_CONFIG)
+
+
+# Creates the user_data table if it does not exist
+def create_table(connection):
+    cursor = connection.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id CHAR(36) NOT NULL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            age DECIMAL(5, 0) NOT NULL,
+            seq BIGINT NOT NULL AUTO_INCREMENT UNIQUE
+        )
+        """
+    )
+    # Tables created before `seq` existed get it added, numbered in
+    # physical order. seq records insertion order, so incremental
+    # consumers can pick up only the rows added since their last run.
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = 'user_data' AND column_name = 'seq'"
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute("ALTER TABLE user_data ADD COLUMN seq BIGINT NOT NULL AUTO_INCREMENT UNIQUE")
+    # user_id is the primary key, so an extra index on it only costs
+    # writes; drop it from tables that were created with one
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = 'user_data' AND index_name = 'idx_user_id'"
+    )
+    if cursor.fetchone()[0]:
+        cursor.execute("DROP INDEX idx_user_id ON user_data")
+    connection.commit()
+    cursor.close()
+    print("Table user_data created successfully")
+
+
+# Namespace for deterministic user_ids: the same email always gets the same
+# id, so reloading a CSV skips the rows that are already there
+USER_ID_NAMESPACE = uuid.UUID("6f1d2c1e-6c1b-4d55-9c39-1a6f0b7c2e64")
+
+
+# Lazily parses the CSV file into (user_id, name, email, age) tuples
+def read_users(path):
+    with open(path, newline="") as csv_file:
+        for row in csv.DictReader(csv_file):
+            yield (
+                str(uuid.uuid5(USER_ID_NAMESPACE, row["email"])),
+                row["name"],
+                row["email"],
+                row["age"],
+            )
+
+
+# Index lines of SHOW CREATE TABLE that are not unique: KEY, FULLTEXT KEY
+# and SPATIAL KEY, kept verbatim so prefix lengths, ordering and index
+# types survive a drop and re-add
+_MYSQL_INDEX = re.compile(r"^\s*((?:FULLTEXT |SPATIAL )?KEY `([^`]+)` .*?),?$", re.MULTILINE)
+
+
+# Non-unique secondary indexes of user_data as (drop, create) statement
+# pairs. Works on MySQL and on a local SQLite database; unique indexes
+# (the primary key, seq) are never included since INSERT IGNORE and
+# AUTO_INCREMENT depend on them.
+def secondary_indexes(connection):
+    cursor = connection.cursor()
+    if isinstance(connection, sqlite3.Connection):
+        cursor.execute(
+            "SELECT m.name, m.sql FROM sqlite_master AS m "
+            "JOIN pragma_index_list('user_data') AS i ON i.name = m.name "
+            "WHERE m.type = 'index' AND m.sql IS NOT NULL AND NOT i.\"unique\""
+        )
+        indexes = [(f'DROP INDEX "{name}"', sql) for name, sql in cursor.fetchall()]
+    else:
+        cursor.execute("SHOW CREATE TABLE user_data")
+        indexes = [
+            (f"ALTER TABLE user_data DROP INDEX `{name}`", f"ALTER TABLE user_data ADD {definition}")
+            for definition, name in _MYSQL_INDEX.findall(cursor.fetchone()[1])
+        ]
+    cursor.close()
+    return indexes
+
+
+# Inserts the rows of the CSV file `data` that are not in the table yet.
+# Rows are streamed from the file and written with executemany in chunks
+# of `chunk_size`, one transaction per chunk; INSERT IGNORE skips rows
+# whose user_id already exists. defer_indexes drops the non-unique
+# secondary indexes for the duration of the load and rebuilds them once
+# at the end. Returns the number of rows inserted. `connection` is a
+# MySQL connection, or a sqlite3 one for local tests.
+def insert_data(connection, data, chunk_size=5000, defer_indexes=False):
+    if isinstance(connection, sqlite3.Connection):
+        insert = "INSERT OR IGNORE INTO user_data (user_id, name, email, age) VALUES (?, ?, ?, ?)"
+    else:
+        insert = "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+    cursor = connection.cursor()
+    deferred = secondary_indexes(connection) if defer_indexes else []
+    for drop, _ in deferred:
+        cursor.execute(drop)
+    inserted = 0
+    try:
+        rows = read_users(data)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            cursor.executemany(insert, chunk)
+            inserted += cursor.rowcount
+            connection.commit()
+    except (mysql.connector.Error, sqlite3.Error):
+        connection.rollback()
+        raise
+    finally:
+        for _, create in deferred:
+            cursor.execute(create)
+        cursor.close()
+    return inserted
+
+
+# Compact user record with attribute access; __slots__ keeps it much
+# smaller than a dict and cheap to build from a tuple row
+class UserRow:
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRow):
+            return NotImplemented
+        return (self.user_id, self.name, self.email, self.age) == \
+            (other.user_id, other.name, other.email, other.age)
+
+    def __repr__(self):
+        return f"UserRow(user_id={self.user_id!r}, name={self.name!r}, email={self.email!r}, age={self.age!r})"
+
+
+# Core of the streaming pipeline: run `query` over an unbuffered
+# (server-side) cursor and yield lists of at most `batch_size` rows, so
+# memory use does not depend on the size of the result. The query runs on
+# its own connection unless `connection` is given, which is left open.
+def stream_query(query, params=(), batch_size=1000, dictionary=True, connection=None):
+    owned = connection is None
+    if owned:
+        connection = open_prodev()
+    cursor = connection.cursor(dictionary=dictionary, buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass  # unread rows left when the consumer stopped early
+        if owned:
+            connection.close()
+
+
+# Same as stream_query, one row at a time
+def stream_rows(query, params=(), batch_size=1000, dictionary=True):
+    for rows in stream_query(query, params, batch_size, dictionary):
+        yield from rows
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Test suite for the user_data generators and their helper modules.
+
+Includes tests for:
+- insert_data (seed), against a local SQLite database
+- stream_query connection errors (seed)
+- keyset and OFFSET pagination (pagination, 2-lazy_paginate)
+- AgeStats merging and incremental updates (aggregates)
+- read_ahead ordering, errors and early close (pagination)
+"""
+
+import os
+import csv
+import sys
+import importlib
+import sqlite3
+import tempfile
+import threading
+import statistics
+import unittest
+from unittest.mock import patch
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import mysql.connector  # noqa: E402
+
+import seed  # noqa: E402
+
+
+def write_csv(path, users):
+    """Write (name, email, age) rows to a user_data.csv-shaped file."""
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["name", "email", "age"])
+        writer.writerows(users)
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3 (%s placeholders, dict rows)."""
+
+    def __init__(self, conn, dictionary=False, **kwargs):
+        self.cursor = conn.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, query, params=()):
+        self.cursor.execute(query.replace("%s", "?"), params)
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip((column[0] for column in self.cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self.cursor.fetchone())
+
+    def fetchmany(self, size):
+        return [self._row(row) for row in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self.cursor.fetchall()]
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteProdev:
+    """Stands in for a MySQL connection to ALX_prodev, backed by SQLite."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+
+    def cursor(self, **kwargs):
+        return SQLiteCursor(self.conn, **kwargs)
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def prodev_database(path, n_users):
+    """Create a user_data table with `n_users` rows; seq is 1..n_users."""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE user_data (user_id CHAR(36) PRIMARY KEY, name TEXT, "
+        "email TEXT, age INTEGER, seq INTEGER UNIQUE)"
+    )
+    conn.executemany(
+        "INSERT INTO user_data VALUES (?, ?, ?, ?, ?)",
+        ((f"{i * 7919 % 65536:04x}-{i:06d}", f"user{i}", f"user{i}@example.com", 18 + i % 60, i + 1)
+         for i in range(n_users)),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestInsertData(unittest.TestCase):
+    """
+    TestCase for the streaming CSV loader, run on SQLite.
+    """
+
+    def setUp(self):
+        """Create an empty user_data table and a 7-user CSV file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp.name, "user_data.csv")
+        self.users = [(f"user{i}", f"user{i}@example.com", 20 + i) for i in range(7)]
+        write_csv(self.csv_path, self.users)
+        self.conn = sqlite3.connect(os.path.join(self.tmp.name, "prodev.db"))
+        self.conn.execute(
+            "CREATE TABLE user_data (user_id CHAR(36) NOT NULL PRIMARY KEY, "
+            "name VARCHAR(255) NOT NULL, email VARCHAR(255) NOT NULL, "
+            "age DECIMAL(5, 0) NOT NULL, seq INTEGER UNIQUE)"
+        )
+        self.conn.execute("CREATE INDEX idx_name ON user_data (name DESC)")
+        self.commits = []
+        self.conn.set_trace_callback(
+            lambda sql: self.commits.append(sql) if sql == "COMMIT" else None
+        )
+
+    def tearDown(self):
+        """Close the database and remove the temp dir."""
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_inserts_in_chunks(self):
+        """
+        Test that every row is inserted, one transaction per chunk.
+        """
+        self.assertEqual(seed.insert_data(self.conn, self.csv_path, chunk_size=3), 7)
+        self.assertEqual(len(self.commits), 3)
+        rows = self.conn.execute("SELECT name, email, age FROM user_data ORDER BY age").fetchall()
+        self.assertEqual(rows, self.users)
+
+    def test_reload_is_idempotent(self):
+        """
+        Test that loading the same file again inserts nothing, and that a
+        file with new users only inserts those.
+        """
+        seed.insert_data(self.conn, self.csv_path, chunk_size=3)
+        self.assertEqual(seed.insert_data(self.conn, self.csv_path, chunk_size=3), 0)
+        write_csv(self.csv_path, self.users + [("new0", "new0@example.com", 30),
+                                               ("new1", "new1@example.com", 31)])
+        self.assertEqual(seed.insert_data(self.conn, self.csv_path, chunk_size=3), 2)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM user_data").fetchone(), (9,))
+
+    def test_user_ids_are_stable(self):
+        """
+        Test that a user's id depends only on their email.
+        """
+        first = next(seed.read_users(self.csv_path))
+        self.assertEqual(first[0], next(seed.read_users(self.csv_path))[0])
+        self.assertEqual(first[1:], ("user0", "user0@example.com", "20"))
+
+    def test_defers_secondary_indexes(self):
+        """
+        Test that defer_indexes drops idx_name during the load and restores
+        its exact definition afterwards, leaving unique indexes alone.
+        """
+        definition = self.index_sql()
+        seen = []
+        read_users = seed.read_users
+
+        def check_indexes(path):
+            seen.append(self.index_sql())
+            yield from read_users(path)
+
+        with patch.object(seed, "read_users", check_indexes):
+            self.assertEqual(seed.insert_data(self.conn, self.csv_path, defer_indexes=True), 7)
+        self.assertEqual(seen, [None])
+        self.assertEqual(self.index_sql(), definition)
+        self.assertEqual(len(seed.secondary_indexes(self.conn)), 1)
+
+    def test_failed_load_restores_indexes(self):
+        """
+        Test that indexes come back even when the load fails.
+        """
+        with open(self.csv_path, "a") as csv_file:
+            csv_file.write("broken,broken@example.com,\n")
+        self.conn.execute(
+            "CREATE TRIGGER no_empty_age BEFORE INSERT ON user_data WHEN NEW.age = '' "
+            "BEGIN SELECT RAISE(ABORT, 'age required'); END"
+        )
+        with self.assertRaises(sqlite3.IntegrityError):
+            seed.insert_data(self.conn, self.csv_path, chunk_size=3, defer_indexes=True)
+        self.assertIsNotNone(self.index_sql())
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM user_data").fetchone(), (6,))
+
+    def index_sql(self):
+        """The CREATE INDEX statement of idx_name, or None if it is gone."""
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'idx_name'"
+        ).fetchone()
+        return row and row[0]
+
+
+class TestStreamQuery(unittest.TestCase):
+    """
+    TestCase for how stream_query reports connection failures.
+    """
+
+    def test_connection_error_is_raised(self):
+        """
+        Test that a failed connect raises the connector's error instead of
+        failing later on a None connection.
+        """
+        error = mysql.connector.errors.InterfaceError("2003: Can't connect to MySQL server")
+        with patch.object(seed.mysql.connector, "connect", side_effect=error):
+            with self.assertRaises(mysql.connector.Error):
+                next(seed.stream_query("SELECT 1"))
+            self.assertIsNone(seed.connect_to_prodev())
+
+
+class TestPagination(unittest.TestCase):
+    """
+    TestCase for keyset pagination and the OFFSET pages it replaces.
+    """
+
+    def setUp(self):
+        """Serve ALX_prodev from a 25-user SQLite database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "prodev.db")
+        prodev_database(path, 25)
+        patcher = patch.object(seed, "open_prodev", lambda: SQLiteProdev(path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.pagination = importlib.import_module("pagination")
+        self.paging = importlib.import_module("2-lazy_paginate")
+
+    def test_keyset_pages_match_offset_pages(self):
+        """
+        Test that both page the same rows in user_id order.
+        """
+        keyset = list(self.paging.lazy_paginate(10))
+        offset = [self.paging.paginate_users(10, offset) for offset in (0, 10, 20)]
+        self.assertEqual([len(page) for page in keyset], [10, 10, 5])
+        self.assertEqual(keyset, offset)
+        user_ids = [user["user_id"] for page in keyset for user in page]
+        self.assertEqual(user_ids, sorted(user_ids))
+
+    def test_resume_from_cursor(self):
+        """
+        Test that a stored cursor resumes after the page it came from.
+        """
+        first, cursor = self.pagination.paginate_users_after(10)
+        rest = [page for page, _ in self.pagination.keyset_pages(10, cursor)]
+        self.assertEqual(self.pagination.decode_cursor(cursor), first[-1]["user_id"])
+        self.assertEqual([first] + rest, list(self.paging.lazy_paginate(10)))
+
+    def test_prefetch_yields_the_same_pages(self):
+        """
+        Test that read-ahead does not change what is yielded.
+        """
+        self.assertEqual(list(self.paging.lazy_paginate(4, prefetch=2)),
+                         list(self.paging.lazy_paginate(4)))
+
+    def test_rejects_empty_pages(self):
+        """
+        Test that page_size < 1 raises ValueError.
+        """
+        with self.assertRaises(ValueError):
+            self.pagination.paginate_users_after(0)
+        with self.assertRaises(ValueError):
+            next(self.paging.lazy_paginate(0))
+
+
+class TestAgeStats(unittest.TestCase):
+    """
+    TestCase for mergeable age statistics and the seq watermark.
+    """
+
+    def setUp(self):
+        """Serve ALX_prodev from a 50-user SQLite database."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "prodev.db")
+        prodev_database(self.path, 50)
+        patcher = patch.object(seed, "open_prodev", lambda: SQLiteProdev(self.path))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.aggregates = importlib.import_module("aggregates")
+        self.ages = [18 + i % 60 for i in range(50)]
+
+    def assertMatches(self, stats, ages):
+        """Check `stats` against statistics computed directly from `ages`."""
+        self.assertEqual(stats.count, len(ages))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(ages))
+        self.assertAlmostEqual(stats.variance, statistics.pvariance(ages))
+        self.assertEqual((stats.min, stats.max), (min(ages), max(ages)))
+
+    def test_merge_matches_a_single_pass(self):
+        """
+        Test that merging partial states equals aggregating everything.
+        """
+        AgeStats = self.aggregates.AgeStats
+        shards = [self.ages[:7], self.ages[7:8], self.ages[8:]]
+        total = AgeStats()
+        for shard in shards:
+            partial = AgeStats()
+            for age in shard:
+                partial.add(age)
+            total.merge(partial)
+        self.assertMatches(total, self.ages)
+
+    def test_merge_with_empty_states(self):
+        """
+        Test that merging into or from an empty state keeps the other
+        side's values and the highest last_seq.
+        """
+        AgeStats = self.aggregates.AgeStats
+        full = self.aggregates.age_stats()
+        merged = AgeStats(last_seq=60).merge(AgeStats.from_dict(full.to_dict()))
+        self.assertMatches(merged, self.ages)
+        self.assertEqual(merged.last_seq, 60)
+        self.assertEqual(full.merge(AgeStats(last_seq=70)).last_seq, 70)
+        self.assertEqual(AgeStats().merge(AgeStats()).count, 0)
+
+    def test_parallel_matches_sequential(self):
+        """
+        Test that the sharded scan covers every row exactly once.
+        """
+        self.assertEqual(len(self.aggregates.seq_ranges(4)), 4)
+        stats = self.aggregates.parallel_age_stats(shards=4)
+        self.assertMatches(stats, self.ages)
+        self.assertEqual(stats.last_seq, 50)
+
+    def test_update_folds_in_new_rows_only(self):
+        """
+        Test that a second run only reads rows added since the first and
+        ends with the same result as a full scan.
+        """
+        state_path = os.path.join(self.tmp.name, "age_stats.json")
+        self.assertMatches(self.aggregates.update_age_stats(state_path), self.ages)
+        conn = sqlite3.connect(self.path)
+        conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?, ?)",
+                         ((f"new-{i}", "new", "new@example.com", 90 + i, 51 + i) for i in range(3)))
+        conn.commit()
+        conn.close()
+        with patch.object(self.aggregates, "age_stats", wraps=self.aggregates.age_stats) as scan:
+            stats = self.aggregates.update_age_stats(state_path)
+        scan.assert_called_once_with(after_seq=50)
+        self.assertMatches(stats, self.ages + [90, 91, 92])
+        self.assertEqual(stats.last_seq, 53)
+
+
+class TestReadAhead(unittest.TestCase):
+    """
+    TestCase for the background prefetching behind lazy_paginate(prefetch=...).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the pagination module."""
+        cls.read_ahead = staticmethod(importlib.import_module("pagination").read_ahead)
+
+    def test_keeps_order(self):
+        """
+        Test that items come out in the order the iterable produced them.
+        """
+        self.assertEqual(list(self.read_ahead(range(100), 3)), list(range(100)))
+
+    def test_reraises_errors(self):
+        """
+        Test that an error in the iterable reaches the consumer after the
+        items produced before it.
+        """
+        def failing():
+            yield 1
+            raise RuntimeError("lost connection")
+
+        items = self.read_ahead(failing(), 2)
+        self.assertEqual(next(items), 1)
+        with self.assertRaisesRegex(RuntimeError, "lost connection"):
+            next(items)
+
+    def test_close_stops_the_reader(self):
+        """
+        Test that closing early stops the reader thread, which stays at
+        most `depth` items ahead of the consumer.
+        """
+        produced = []
+
+        def endless():
+            while True:
+                produced.append(len(produced))
+                yield produced[-1]
+
+        before = threading.active_count()
+        items = self.read_ahead(endless(), 2)
+        self.assertEqual(next(items), 0)
+        items.close()
+        self.assertEqual(threading.active_count(), before)
+        self.assertLessEqual(len(produced), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import itertools
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the stdlib path is used without it
+    np = None
+
+
+# Columnar batch of users: parallel columns instead of one dict per row.
+# Ages live in a contiguous array of doubles so filters and aggregates run
+# over one buffer (with numpy when it is installed).
+class UserBatch:
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = list(user_id)
+        self.name = list(name)
+        self.email = list(email)
+        self.age = age if isinstance(age, array) else array("d", age)
+
+    # Builds a batch from (user_id, name, email, age) tuples
+    @classmethod
+    def from_rows(cls, rows):
+        if not rows:
+            return cls((), (), (), ())
+        return cls(*zip(*rows))
+
+    def __len__(self):
+        return len(self.age)
+
+    def _ages(self):
+        return np.frombuffer(self.age, dtype=np.float64)
+
+    # New batch with the rows whose mask entry is true
+    def select(self, mask):
+        return UserBatch(
+            itertools.compress(self.user_id, mask),
+            itertools.compress(self.name, mask),
+            itertools.compress(self.email, mask),
+            array("d", itertools.compress(self.age, mask)),
+        )
+
+    def older_than(self, min_age):
+        if np is not None:
+            return self.select(self._ages() > min_age)
+        return self.select([age > min_age for age in self.age])
+
+    def mean_age(self):
+        if not self.age:
+            return 0.0
+        if np is not None:
+            return float(self._ages().mean())
+        return sum(self.age) / len(self.age)
+
+    # Row view as dicts, for code written against dict batches
+    def rows(self):
+        return [
+            {"user_id": u, "name": n, "email": e, "age": a}
+            for u, n, e, a in zip(self.user_id, self.name, self.email, self.age)
+        ]
+
+
+# Batch with only the users older than min_age, for both UserBatch and
+# list-of-dicts batches
+def older_than(batch, min_age):
+    if isinstance(batch, UserBatch):
+        return batch.older_than(min_age)
+    return [user for user in batch if user["age"] > min_age]